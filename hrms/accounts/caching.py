@@ -0,0 +1,116 @@
+import math
+import time
+import datetime
+from urllib.parse import quote
+from django.core.cache import cache
+from django.db import transaction
+
+ATTENDANCE_VERSION_KEY = "attendance:version"
+PAYROLL_EPOCH_KEY = "payroll:epoch"
+PROFILES_VERSION_KEY = "profiles:version"
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+
+def _seed():
+    # A cold cache starts counting from the current time in ms, above any counter
+    # an evicted key may have reached, so old snapshots are never served.
+    return time.time_ns() // 1_000_000
+
+
+def _version(key):
+    """Current version counter stored under `key`."""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _seed(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(key):
+    # add + incr instead of get + set: concurrent bumps each move the counter
+    # (atomic on Redis/Memcached/LocMem; see CACHES in settings).
+    try:
+        cache.incr(key)
+    except ValueError:  # missing or evicted: a fresh seed is already above the old counter
+        cache.add(key, _seed(), None)
+    cache.set(f"{key}:modified", math.ceil(time.time()), None)
+
+
+def _last_modified(key):
+    """Unix second of the last bump of `key`, or None while that second is still running.
+
+    If-Modified-Since only has second precision, so a Last-Modified sent during the
+    second of a write could hide a second write in the same second; ETags cover it.
+    """
+    modified = cache.get(f"{key}:modified")
+    if modified is None:
+        modified = math.ceil(time.time())
+        cache.add(f"{key}:modified", modified, None)
+    if modified > time.time():
+        return None
+    return modified
+
+
+def attendance_version():
+    return _version(ATTENDANCE_VERSION_KEY)
+
+
+def bump_attendance_version():
+    # Bump after commit so a reader can't cache pre-commit rows under the new version.
+    transaction.on_commit(lambda: _bump(ATTENDANCE_VERSION_KEY))
+
+
+def attendance_etag(date):
+    return f'"{date.isoformat()}-{attendance_version()}"'
+
+
+def attendance_last_modified():
+    modified = _last_modified(ATTENDANCE_VERSION_KEY)
+    if modified is None:
+        return None
+    return datetime.datetime.fromtimestamp(modified, tz=datetime.timezone.utc)
+
+
+def cached_snapshot(prefix, date, build):
+    """Return build() cached under (prefix, date, attendance version)."""
+    key = f"{prefix}:{date.isoformat()}:{attendance_version()}"
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, SNAPSHOT_TIMEOUT)
+    return data
+
+
+def _month_token(month):
+    # month is free text on Payroll; escape it so spaces etc. stay valid in memcached keys
+    return quote(str(month), safe="")
+
+
+def _payroll_month_key(year, month):
+    return f"payroll:version:{year}:{_month_token(month)}"
+
+
+def payroll_version(year, month):
+    """Version of one payroll month, combined with the epoch bumped on profile (department) changes."""
+    return f"{_version(PAYROLL_EPOCH_KEY)}.{_version(_payroll_month_key(year, month))}"
+
+
+def bump_payroll_version(year, month):
+    transaction.on_commit(lambda: _bump(_payroll_month_key(year, month)))
+
+
+def bump_payroll_epoch():
+    transaction.on_commit(lambda: _bump(PAYROLL_EPOCH_KEY))
+
+
+def payroll_totals_key(year, month):
+    return f"payroll:totals:{year}:{_month_token(month)}:{payroll_version(year, month)}"
+
+
+def profiles_version():
+    """Bumped on every profile (fullname) change; per-process name indexes rebuild when it moves."""
+    return _version(PROFILES_VERSION_KEY)
+
+
+def bump_profiles_version():
+    transaction.on_commit(lambda: _bump(PROFILES_VERSION_KEY))
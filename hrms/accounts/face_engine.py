@@ -0,0 +1,178 @@
+import os
+import json
+import tempfile
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: the cache files are written without a lock
+    fcntl = None
+
+try:
+    import face_recognition
+except ImportError:  # dlib/face_recognition are optional (see requirements.txt)
+    face_recognition = None
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+ENCODING_SIZE = 128
+
+
+class FaceEngineUnavailable(Exception):
+    pass
+
+
+def encode_faces(img_np):
+    """Return every face encoding found in an RGB image as a (n, 128) float32 matrix."""
+    if face_recognition is None:
+        raise FaceEngineUnavailable("face_recognition is not installed")
+    encodings = face_recognition.face_encodings(img_np)
+    if not encodings:
+        return np.empty((0, ENCODING_SIZE), dtype=np.float32)
+    return np.asarray(encodings, dtype=np.float32)
+
+
+class FaceMatcher:
+    """Known face embeddings held in one contiguous float32 matrix.
+
+    Row i of `matrix` belongs to `names[i]`. The matrix and its name index are
+    persisted next to each other (`<cache>.npy` + `<cache>.json`); the json also
+    records each image's mtime so only new or changed images get re-encoded.
+    Both files are read and replaced under `<cache>.lock` (POSIX), so processes loading
+    at the same time never pair one writer's matrix with another's index.
+    """
+
+    def __init__(self, images_dir, cache_path, tolerance=0.6):
+        self.images_dir = str(images_dir)
+        self.cache_path = str(cache_path)
+        self.tolerance = tolerance
+        self.matrix = np.empty((0, ENCODING_SIZE), dtype=np.float32)
+        self.names = []
+        self._sq_norms = np.empty(0, dtype=np.float32)
+
+    @property
+    def index_path(self):
+        return os.path.splitext(self.cache_path)[0] + ".json"
+
+    def _scan_images(self):
+        if not os.path.isdir(self.images_dir):
+            print(f"[FaceMatcher] Known faces directory {self.images_dir} not found.")
+            return {}
+        return {
+            filename: os.path.getmtime(os.path.join(self.images_dir, filename))
+            for filename in sorted(os.listdir(self.images_dir))
+            if filename.lower().endswith(IMAGE_EXTENSIONS)
+        }
+
+    @contextmanager
+    def _cache_lock(self, operation):
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.splitext(self.cache_path)[0] + ".lock", "a") as fh:
+            fcntl.flock(fh, getattr(fcntl, operation))
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _read_cache(self):
+        try:
+            with self._cache_lock("LOCK_SH"):
+                with open(self.index_path) as fh:
+                    index = json.load(fh)
+                matrix = np.load(self.cache_path)
+        except (OSError, ValueError):
+            return {}, {}
+        if matrix.ndim != 2 or len(matrix) != len(index.get("files", [])):
+            return {}, {}
+        cached = {
+            entry["file"]: (entry["mtime"], matrix[row])
+            for row, entry in enumerate(index["files"])
+        }
+        return cached, index.get("skipped", {})
+
+    def _write_cache(self, files, mtimes, skipped):
+        directory = os.path.dirname(self.cache_path) or "."
+        index = {"files": [
+            {"file": f, "name": n, "mtime": mtimes[f]} for f, n in zip(files, self.names)
+        ], "skipped": skipped}
+        with self._cache_lock("LOCK_EX"):
+            # unique temp names: other workers may be rebuilding the cache too
+            fd, tmp_matrix = tempfile.mkstemp(dir=directory, suffix=".npy.tmp")
+            with os.fdopen(fd, "wb") as fh:
+                np.save(fh, self.matrix)
+            fd, tmp_index = tempfile.mkstemp(dir=directory, suffix=".json.tmp")
+            with os.fdopen(fd, "w") as fh:
+                json.dump(index, fh)
+            os.replace(tmp_matrix, self.cache_path)
+            os.replace(tmp_index, self.index_path)
+
+    def _encode_file(self, filename):
+        if face_recognition is None:
+            print(f"[FaceMatcher] face_recognition not installed, cannot encode {filename}.")
+            return None
+        image = face_recognition.load_image_file(os.path.join(self.images_dir, filename))
+        found = encode_faces(image)
+        if not len(found):
+            print(f"[FaceMatcher] No face found in {filename}, skipping.")
+            return None
+        print(f"[FaceMatcher] Encoded {filename}")
+        return found[0]
+
+    def load(self):
+        """Load embeddings from the cache, re-encoding only images whose mtime changed."""
+        current = self._scan_images()
+        cached, cached_skipped = self._read_cache()
+
+        files, rows, skipped = [], [], {}
+        dirty = len(cached) + len(cached_skipped) != len(current)
+        for filename, mtime in current.items():
+            hit = cached.get(filename)
+            if hit is not None and hit[0] == mtime:
+                encoding = hit[1]
+            elif cached_skipped.get(filename) == mtime:
+                skipped[filename] = mtime   # known to contain no face
+                continue
+            else:
+                dirty = True
+                encoding = self._encode_file(filename)
+                if encoding is None:
+                    if face_recognition is not None:
+                        skipped[filename] = mtime
+                    continue
+            files.append(filename)
+            rows.append(encoding)
+
+        self.names = [os.path.splitext(f)[0].lower() for f in files]
+        self.matrix = np.ascontiguousarray(
+            np.vstack(rows) if rows else np.empty((0, ENCODING_SIZE)), dtype=np.float32
+        )
+        self._sq_norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+        if dirty:
+            self._write_cache(files, current, skipped)
+        print(f"[FaceMatcher] Loaded {len(self.names)} known faces (cache {'rebuilt' if dirty else 'hit'})")
+        return self
+
+    def distances(self, encodings):
+        """Euclidean distances between (n, 128) encodings and all known faces -> (n, known)."""
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        sq = np.einsum('ij,ij->i', encodings, encodings)[:, None] + self._sq_norms[None, :] \
+            - 2.0 * (encodings @ self.matrix.T)
+        return np.sqrt(np.maximum(sq, 0.0))
+
+    def match_many(self, encodings):
+        """Best match for every encoding: list of (name or None, distance)."""
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        if not len(encodings) or not len(self.names):
+            return [(None, None)] * len(encodings)
+        dist = self.distances(encodings)
+        best = np.argmin(dist, axis=1)
+        best_dist = dist[np.arange(len(best)), best]
+        return [
+            (self.names[i] if d < self.tolerance else None, float(d))
+            for i, d in zip(best, best_dist)
+        ]
@@ -0,0 +1,193 @@
+import os
+import time
+import base64
+import random
+import threading
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+import numpy as np
+from PIL import Image
+from django.conf import settings
+from .face_engine import FaceMatcher, encode_faces, ENCODING_SIZE
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: slots fall back to a per-process semaphore
+    fcntl = None
+
+
+class RecognitionBusy(Exception):
+    """No queue slot became free within FACE_QUEUE_TIMEOUT."""
+
+
+class RecognitionTimeout(Exception):
+    """The worker did not answer within FACE_RESULT_TIMEOUT."""
+
+
+# =====================
+# Runs inside the pool processes
+# =====================
+_worker_matcher = None
+
+def _init_worker(images_dir, cache_path, tolerance):
+    global _worker_matcher
+    _worker_matcher = FaceMatcher(images_dir, cache_path, tolerance=tolerance).load()
+
+def _ms(start):
+    return round((time.perf_counter() - start) * 1000, 2)
+
+def decode_frame(image_data):
+    if "," in image_data:
+        image_data = image_data.split(",")[1]
+    img = Image.open(BytesIO(base64.b64decode(image_data))).convert('RGB')
+    return np.array(img)
+
+def recognize_frames(frames):
+    """Decode base64 frames, encode every face in each, and match all faces at once.
+
+    Returns {"frames": [[(name or None, distance), ...] per frame], "timings": {stage: ms}}.
+    """
+    timings = {}
+    start = time.perf_counter()
+    images = [decode_frame(image_data) for image_data in frames]
+    timings["decode_ms"] = _ms(start)
+
+    start = time.perf_counter()
+    per_frame = [encode_faces(img_np) for img_np in images]
+    timings["encode_ms"] = _ms(start)
+
+    start = time.perf_counter()
+    stacked = np.vstack(per_frame) if per_frame else np.empty((0, ENCODING_SIZE), dtype=np.float32)
+    matches = _worker_matcher.match_many(stacked) if len(stacked) else []
+    timings["match_ms"] = _ms(start)
+
+    result, offset = [], 0
+    for encodings in per_frame:
+        result.append(matches[offset:offset + len(encodings)])
+        offset += len(encodings)
+    return {"frames": result, "timings": timings}
+
+def recognize_frame(image_data):
+    """Single-frame form of recognize_frames: {"matches": [...], "timings": {...}}."""
+    result = recognize_frames([image_data])
+    return {"matches": result["frames"][0], "timings": result["timings"]}
+
+
+# =====================
+# Used by the web process
+# =====================
+class HostSlots:
+    """`size` in-flight slots shared by every process on this host.
+
+    Slot i is an exclusive flock on <directory>/slot<i>.lock, so all gunicorn
+    workers draw from the same FACE_QUEUE_SIZE slots, and the kernel frees a
+    slot if its process dies.
+    """
+
+    def __init__(self, directory, size):
+        os.makedirs(directory, exist_ok=True)
+        self.paths = [os.path.join(directory, f"slot{i}.lock") for i in range(size)]
+
+    def acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            for path in random.sample(self.paths, len(self.paths)):
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except BlockingIOError:
+                    os.close(fd)
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.02)
+
+    def release(self, fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+class ProcessSlots:
+    """Fallback without fcntl: slots only bound the threads of this process."""
+
+    def __init__(self, size):
+        self._semaphore = threading.BoundedSemaphore(size)
+
+    def acquire(self, timeout):
+        return True if self._semaphore.acquire(timeout=timeout) else None
+
+    def release(self, token):
+        self._semaphore.release()
+
+
+class RecognitionPool:
+    """Process pool with a bounded number of in-flight frames.
+
+    Each pool process loads the embedding matrix once (from the on-disk cache)
+    and keeps it for its lifetime; callers that cannot get a slot within
+    `queue_timeout` get RecognitionBusy instead of piling up. A slot is held
+    until its task really finishes, so frames that timed out but are still
+    being encoded keep counting against the limit.
+    """
+
+    def __init__(self, workers, queue_size, queue_timeout, result_timeout, slot_dir=None):
+        self.queue_timeout = queue_timeout
+        self.result_timeout = result_timeout
+        self._slots = HostSlots(slot_dir, queue_size) if fcntl and slot_dir else ProcessSlots(queue_size)
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(str(settings.KNOWN_FACES_DIR), str(settings.FACE_CACHE_PATH), settings.FACE_MATCH_TOLERANCE),
+        )
+
+    def run(self, fn, *args):
+        start = time.perf_counter()
+        slot = self._slots.acquire(self.queue_timeout)
+        if slot is None:
+            raise RecognitionBusy("Face recognition queue is full")
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release(slot)
+            raise
+        # released when the task ends (or is cancelled before starting), not when we stop waiting
+        future.add_done_callback(lambda _: self._slots.release(slot))
+        queue_ms = _ms(start)
+        try:
+            result = future.result(timeout=self.result_timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise RecognitionTimeout("Face recognition timed out")
+        result["timings"] = {"queue_ms": queue_ms, **result["timings"], "total_ms": _ms(start)}
+        return result
+
+    def recognize(self, image_data):
+        return self.run(recognize_frame, image_data)
+
+    def recognize_many(self, frames):
+        return self.run(recognize_frames, frames)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_recognition_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = RecognitionPool(
+                    workers=settings.FACE_POOL_WORKERS,
+                    queue_size=settings.FACE_QUEUE_SIZE,
+                    queue_timeout=settings.FACE_QUEUE_TIMEOUT,
+                    result_timeout=settings.FACE_RESULT_TIMEOUT,
+                    slot_dir=settings.FACE_SLOT_DIR,
+                )
+    return _pool
+
+
+def server_timing(timings):
+    """Format stage timings as a Server-Timing header value."""
+    return ", ".join(f"{name[:-3]};dur={value}" for name, value in timings.items() if name.endswith("_ms"))
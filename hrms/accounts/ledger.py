@@ -0,0 +1,184 @@
+import datetime
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Case, When, Value, DecimalField
+from django.utils.dateparse import parse_date
+from .models import User, Leave, LeaveLedgerEntry, LeaveBalance
+
+# Ledger kind -> LeaveBalance column it accumulates into
+BALANCE_COLUMN = {
+    "Accrual": "accrued",
+    "Consumption": "consumed",
+    "Adjustment": "adjusted",
+}
+
+
+def accrual_rates():
+    """{leave_type: Decimal days per month}; only these leave types are balance-tracked."""
+    return {leave_type: Decimal(str(days)) for leave_type, days in settings.LEAVE_ACCRUAL_PER_MONTH.items()}
+
+
+def is_tracked(leave_type):
+    return leave_type in settings.LEAVE_ACCRUAL_PER_MONTH
+
+
+def leave_length(start, end):
+    if isinstance(start, str):
+        start, end = parse_date(start), parse_date(end)
+    return Decimal((end - start).days + 1)
+
+
+def _apply(emails, leave_type, kind, days):
+    """Add `days` to the balance row of every email (creating missing rows) in one UPDATE."""
+    LeaveBalance.objects.bulk_create(
+        [LeaveBalance(email_id=email, leave_type=leave_type) for email in emails],
+        ignore_conflicts=True,
+    )
+    column = BALANCE_COLUMN[kind]
+    # consumption entries are negative; `consumed` is kept as a positive total
+    amount = -days if kind == "Consumption" else days
+    LeaveBalance.objects.filter(email__in=emails, leave_type=leave_type).update(
+        **{column: F(column) + amount},
+        balance=F('balance') + days,
+    )
+
+
+def _apply_grouped(kind, days_by_key):
+    """Add {(email, leave_type): days} to the balance rows (creating missing ones) in one UPDATE."""
+    days_by_key = {key: days for key, days in days_by_key.items() if days}
+    if not days_by_key:
+        return
+    LeaveBalance.objects.bulk_create(
+        [LeaveBalance(email_id=email, leave_type=leave_type) for email, leave_type in days_by_key],
+        ignore_conflicts=True,
+    )
+    column = BALANCE_COLUMN[kind]
+    condition = Q()
+    for email, leave_type in days_by_key:
+        condition |= Q(email=email, leave_type=leave_type)
+    days = Case(
+        *[When(email=email, leave_type=leave_type, then=Value(amount))
+          for (email, leave_type), amount in days_by_key.items()],
+        output_field=DecimalField(max_digits=6, decimal_places=2),
+    )
+    # consumption entries are negative; `consumed` is kept as a positive total
+    LeaveBalance.objects.filter(condition).update(
+        **{column: F(column) - days if kind == "Consumption" else F(column) + days},
+        balance=F('balance') + days,
+    )
+
+
+def post_entry(email, leave_type, kind, days, leave=None, note=None):
+    with transaction.atomic():
+        entry = LeaveLedgerEntry.objects.create(
+            email_id=email, leave_type=leave_type, kind=kind, days=days, leave=leave, note=note,
+        )
+        _apply([email], leave_type, kind, days)
+    return entry
+
+
+def has_ledger(email, leave_type):
+    """Whether the user has any balance for this leave type yet (accrual, opening balance, ...)."""
+    return LeaveBalance.objects.filter(email=email, leave_type=leave_type).exists()
+
+
+def get_balance(email, leave_type):
+    row = LeaveBalance.objects.filter(email=email, leave_type=leave_type).values_list('balance', flat=True).first()
+    return row if row is not None else Decimal("0")
+
+
+def available_days(email, leave_type, exclude_leave_id=None):
+    """Balance minus days already requested in Pending leaves of the same type."""
+    pending = Leave.objects.filter(email=email, leave_type=leave_type, status="Pending")
+    if exclude_leave_id:
+        pending = pending.exclude(id=exclude_leave_id)
+    held = sum((leave_length(start, end) for start, end in pending.values_list('start_date', 'end_date')), Decimal("0"))
+    return get_balance(email, leave_type) - held
+
+
+def record_status_change(leaves, old_statuses):
+    """Post consumption when a tracked leave becomes Approved, and reverse it when it stops being Approved."""
+    entries = []
+    for leave in leaves:
+        if not is_tracked(leave.leave_type):
+            continue
+        was_approved = old_statuses.get(leave.id) == "Approved"
+        if leave.status == "Approved" and not was_approved:
+            days, note = -leave_length(leave.start_date, leave.end_date), None
+        elif leave.status != "Approved" and was_approved:
+            days, note = leave_length(leave.start_date, leave.end_date), f"Reversal: leave {leave.status}"
+        else:
+            continue
+        entries.append(LeaveLedgerEntry(
+            email_id=leave.email_id, leave_type=leave.leave_type, leave_id=leave.id,
+            kind="Consumption", days=days, note=note,
+        ))
+
+    totals = {}
+    for entry in entries:
+        key = (entry.email_id, entry.leave_type)
+        totals[key] = totals.get(key, Decimal("0")) + entry.days
+    with transaction.atomic():
+        LeaveLedgerEntry.objects.bulk_create(entries)
+        _apply_grouped("Consumption", totals)
+    return entries
+
+
+def post_monthly_accruals(year, month):
+    """Credit every active profiled user with this month's accrual, once per period.
+
+    Returns {leave_type: users credited}. Re-running for the same period is a no-op.
+    """
+    period = f"{year:04d}-{month:02d}"
+    users = list(User.objects.with_profile().filter(is_active=True).values_list('email', flat=True))
+    credited = {}
+    with transaction.atomic():
+        for leave_type, days in accrual_rates().items():
+            done = set(
+                LeaveLedgerEntry.objects.filter(kind="Accrual", leave_type=leave_type, period=period)
+                .values_list('email', flat=True)
+            )
+            emails = [email for email in users if email not in done]
+            if not emails:
+                credited[leave_type] = 0
+                continue
+            LeaveLedgerEntry.objects.bulk_create(
+                [
+                    LeaveLedgerEntry(email_id=email, leave_type=leave_type, kind="Accrual", days=days,
+                                     period=period, note=f"Monthly accrual {period}")
+                    for email in emails
+                ],
+                batch_size=1000,
+            )
+            _apply(emails, leave_type, "Accrual", days)
+            credited[leave_type] = len(emails)
+    return credited
+
+
+def post_opening_balances(days_by_type):
+    """Credit {leave_type: days} to every active profiled user with no ledger for that type yet.
+
+    Loads starting balances when balance tracking is switched on; users that already
+    have a balance row are left alone, so re-running is a no-op. Returns {leave_type: users}.
+    """
+    users = list(User.objects.with_profile().filter(is_active=True).values_list('email', flat=True))
+    credited = {}
+    with transaction.atomic():
+        for leave_type, days in days_by_type.items():
+            started = set(
+                LeaveBalance.objects.filter(leave_type=leave_type, email__in=users).values_list('email', flat=True)
+            )
+            emails = [email for email in users if email not in started]
+            if emails:
+                LeaveLedgerEntry.objects.bulk_create(
+                    [
+                        LeaveLedgerEntry(email_id=email, leave_type=leave_type, kind="Adjustment", days=days,
+                                         note="Opening balance")
+                        for email in emails
+                    ],
+                    batch_size=1000,
+                )
+                _apply(emails, leave_type, "Adjustment", days)
+            credited[leave_type] = len(emails)
+    return credited
@@ -0,0 +1,194 @@
+import json
+import base64
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.db.models.functions import Substr
+from django.http import JsonResponse
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def ordering_fields(model):
+    """Model Meta.ordering plus the primary key as a tiebreaker: [(field, descending)]."""
+    ordering = [(name.lstrip('-'), name.startswith('-')) for name in model._meta.ordering]
+    pk = model._meta.pk.name
+    if pk not in [name for name, _ in ordering]:
+        ordering.append((pk, ordering[-1][1] if ordering else False))
+    return ordering
+
+
+def _encode_value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def encode_cursor(obj, ordering):
+    values = [_encode_value(getattr(obj, obj._meta.get_field(name).attname)) for name, _ in ordering]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, model, ordering):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise ValueError
+        return [model._meta.get_field(name).to_python(value) for (name, _), value in zip(ordering, values)]
+    except (ValueError, TypeError, ValidationError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def after_cursor(ordering, values):
+    """Keyset condition selecting rows strictly after `values` in `ordering`."""
+    condition = Q()
+    equal = {}
+    for (name, descending), value in zip(ordering, values):
+        condition |= Q(**equal, **{f"{name}__{'lt' if descending else 'gt'}": value})
+        equal[name] = value
+    return condition
+
+
+def page_size(request):
+    default = getattr(settings, 'LIST_PAGE_SIZE', 100)
+    maximum = getattr(settings, 'LIST_MAX_PAGE_SIZE', 1000)
+    try:
+        limit = int(request.GET.get('limit', default))
+    except ValueError:
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def sparse_options(request, large_fields):
+    """Parse ?fields= and ?snippet= -> (wanted keys or None, large fields to defer, snippet length)."""
+    fields = request.GET.get('fields')
+    wanted = {name for name in fields.split(',') if name} if fields else None
+    shown = [name for name in large_fields if wanted is None or name in wanted]
+    snippet = request.GET.get('snippet')
+    if snippet:
+        try:
+            snippet = int(snippet)
+            if snippet < 1:
+                raise ValueError
+        except ValueError:
+            raise ValueError("snippet must be a positive integer")
+    deferred = [name for name in large_fields if name not in shown] + (shown if snippet else [])
+    return wanted, deferred, (snippet or None), shown
+
+
+class _NotLoaded:
+    """Stands in for columns left out by ?fields= so row() can still build (and then drop) their keys."""
+
+    def __str__(self):
+        return ""
+
+    def __bool__(self):
+        return False
+
+    def __getattr__(self, name):
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+
+NOT_LOADED = _NotLoaded()
+
+
+def only_fields(model, wanted, columns, ordering, select_related):
+    """Field paths for .only() covering the requested keys, or None if a key can't be mapped.
+
+    A key reads the model field of the same name unless `columns` lists the paths it
+    reads; the pk, the ordering (cursor) fields and select_related relations are always kept.
+    """
+    names = {model._meta.pk.name, *(name for name, _ in ordering), *select_related}
+    for key in wanted:
+        if key in columns:
+            names.update(columns[key])
+            continue
+        try:
+            field = model._meta.get_field(key)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete:
+            return None
+        names.add(key)
+    for relation in select_related:
+        # a joined row nobody asked for: load just its key
+        if not any(name.startswith(f"{relation}__") for name in names):
+            names.add(f"{relation}__{model._meta.get_field(relation).related_model._meta.pk.name}")
+    return names
+
+
+def _fill_not_loaded(obj):
+    for name in obj.get_deferred_fields():
+        obj.__dict__[name] = NOT_LOADED
+
+
+def paginated_list(request, queryset, key, row, filters=None, select_related=(), extra=None, large_fields=(),
+                   columns=None):
+    """Shared body of the list_* views.
+
+    - `filters` whitelists query params: {"param": "orm_lookup"}; anything else is ignored.
+    - rows are ordered by the model's Meta.ordering (+ pk) and paged with an opaque
+      `cursor` param; the response carries `next_cursor` (None on the last page).
+    - `row(obj)` builds the same dict the view always returned under `key`.
+    - `extra(queryset)`, if given, returns a dict merged into the response; it gets
+      the filtered queryset before the cursor is applied (e.g. for totals).
+    - `?fields=a,b` keeps only those keys of each row and selects only the columns
+      they need (see only_fields; `columns` maps keys that are not model fields,
+      e.g. {"role": ["email__role"]}); otherwise `large_fields` (big text columns)
+      left out of it are deferred, so they are never read from the database.
+      `?snippet=N` returns the first N characters of the large fields that are
+      shown, cut in SQL.
+    """
+    model = queryset.model
+    ordering = ordering_fields(model)
+
+    lookups = {}
+    for param, lookup in (filters or {}).items():
+        value = request.GET.get(param)
+        if value not in (None, ''):
+            # `__in` lookups take a comma-separated list: ?status=Pending,On Hold
+            lookups[lookup] = value.split(',') if lookup.endswith('__in') else value
+
+    try:
+        wanted, deferred, snippet, shown = sparse_options(request, large_fields)
+        queryset = queryset.filter(**lookups)
+        payload = extra(queryset) if extra else {}
+        cursor = request.GET.get('cursor')
+        if cursor:
+            queryset = queryset.filter(after_cursor(ordering, decode_cursor(cursor, model, ordering)))
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        only = only_fields(model, wanted, columns or {}, ordering, select_related) if wanted is not None else None
+        if only is not None:
+            queryset = queryset.only(*(only - set(deferred)))
+        elif deferred:
+            queryset = queryset.defer(*deferred)
+        if snippet:
+            queryset = queryset.annotate(**{f"{name}_snippet": Substr(name, 1, snippet) for name in shown})
+
+        limit = page_size(request)
+        order_by = [f"{'-' if descending else ''}{name}" for name, descending in ordering]
+        objects = list(queryset.order_by(*order_by)[:limit + 1])
+    except (InvalidCursor, ValidationError, ValueError) as e:
+        message = e.messages[0] if isinstance(e, ValidationError) else str(e)
+        return JsonResponse({"error": message}, status=400)
+
+    next_cursor = encode_cursor(objects[limit - 1], ordering) if len(objects) > limit else None
+    rows = []
+    for obj in objects[:limit]:
+        # fill deferred columns (with the snippet, or None when not shown) so that
+        # row() reads them from the instance instead of loading each one
+        for name in deferred:
+            obj.__dict__[name] = getattr(obj, f"{name}_snippet") if snippet and name in shown else None
+        if only is not None:
+            # the other columns only feed keys that are dropped below
+            _fill_not_loaded(obj)
+            for relation in select_related:
+                if getattr(obj, relation) is not None:
+                    _fill_not_loaded(getattr(obj, relation))
+        data = row(obj)
+        rows.append({k: v for k, v in data.items() if k in wanted} if wanted is not None else data)
+    return JsonResponse({key: rows, "next_cursor": next_cursor, **payload}, status=200)
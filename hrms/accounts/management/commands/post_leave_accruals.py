@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from accounts.ledger import post_monthly_accruals
+
+
+class Command(BaseCommand):
+    help = "Post monthly leave accruals for every active user (safe to re-run for the same month)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--month", help="Accrual period as YYYY-MM (default: current month)")
+
+    def handle(self, *args, **options):
+        if options["month"]:
+            try:
+                year, month = (int(part) for part in options["month"].split("-"))
+                if not 1 <= month <= 12:
+                    raise ValueError
+            except ValueError:
+                raise CommandError("--month must be YYYY-MM.")
+        else:
+            today = timezone.localdate()
+            year, month = today.year, today.month
+
+        credited = post_monthly_accruals(year, month)
+        for leave_type, count in credited.items():
+            self.stdout.write(f"{leave_type}: credited {count} users")
+        self.stdout.write(self.style.SUCCESS(f"Posted accruals for {year:04d}-{month:02d}"))
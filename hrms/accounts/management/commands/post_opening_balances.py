@@ -0,0 +1,28 @@
+from decimal import Decimal, InvalidOperation
+from django.core.management.base import BaseCommand, CommandError
+from accounts.ledger import post_opening_balances, is_tracked
+
+
+class Command(BaseCommand):
+    help = "Load opening leave balances for users that have no ledger yet (safe to re-run)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("balances", nargs="+", help="LEAVE_TYPE=DAYS, e.g. Casual=12 Sick=8")
+
+    def handle(self, *args, **options):
+        days_by_type = {}
+        for item in options["balances"]:
+            leave_type, _, days = item.partition("=")
+            try:
+                days_by_type[leave_type] = Decimal(days)
+                if not days_by_type[leave_type].is_finite():
+                    raise InvalidOperation
+            except InvalidOperation:
+                raise CommandError(f"Expected LEAVE_TYPE=DAYS, got {item!r}.")
+            if not is_tracked(leave_type):
+                raise CommandError(f"{leave_type} is not in LEAVE_ACCRUAL_PER_MONTH.")
+
+        credited = post_opening_balances(days_by_type)
+        for leave_type, count in credited.items():
+            self.stdout.write(f"{leave_type}: opened {count} users")
+        self.stdout.write(self.style.SUCCESS("Opening balances posted"))
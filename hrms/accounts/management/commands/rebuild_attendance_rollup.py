@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from accounts.rollups import rebuild_attendance_rollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the MonthlyAttendance rollup for every month touched by a date range."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", required=True, help="First date, YYYY-MM-DD")
+        parser.add_argument("--end", help="Last date, YYYY-MM-DD (default: today)")
+
+    def handle(self, *args, **options):
+        start = parse_date(options["start"])
+        end = parse_date(options["end"]) if options["end"] else timezone.localdate()
+        if not start or not end:
+            raise CommandError("Dates must be in YYYY-MM-DD format.")
+        if start > end:
+            raise CommandError("--start must not be after --end.")
+
+        with transaction.atomic():
+            count = rebuild_attendance_rollup(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} monthly attendance rows for {start} .. {end}"))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from accounts.task_counters import rebuild_task_counters
+
+
+class Command(BaseCommand):
+    help = "Recount the per-user and per-department task status counters from TaskTable."
+
+    def handle(self, *args, **options):
+        count = rebuild_task_counters()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} task counter rows"))
@@ -0,0 +1,42 @@
+import os
+from concurrent.futures import as_completed
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from accounts.models import Payroll
+from accounts.payslips import PayslipRenderer, with_fullname, payslip_data
+
+
+class Command(BaseCommand):
+    help = "Render payslip PDFs for every payroll of a month (up-to-date files are kept)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--month", required=True, help="Payroll month, as stored on Payroll.month")
+        parser.add_argument("--year", type=int, default=timezone.now().year)
+        parser.add_argument("--workers", type=int, default=settings.PAYSLIP_WORKERS)
+
+    def handle(self, *args, **options):
+        payrolls = with_fullname(Payroll.objects.filter(month=options["month"], year=options["year"]))
+        renderer = PayslipRenderer(workers=options["workers"])
+        futures, cached, elsewhere = {}, 0, 0
+        for payroll in payrolls.iterator(chunk_size=1000):
+            path, future = renderer.submit(payslip_data(payroll), retry=True)
+            if future is not None:
+                futures[future] = payroll.id
+            elif os.path.exists(path):
+                cached += 1
+            else:
+                elsewhere += 1  # being rendered by a web worker
+
+        failed = 0
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"payroll {futures[future]}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Payslips {options['month']} {options['year']}: rendered {len(futures) - failed}, "
+            f"up to date {cached}, rendering elsewhere {elsewhere}, failed {failed}"
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from accounts.payroll_run import run_payroll
+
+
+class Command(BaseCommand):
+    help = "Generate payroll for every active user for a month (existing payrolls are skipped)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--month", required=True, help="Payroll month, as stored on Payroll.month")
+        parser.add_argument("--year", type=int, default=timezone.now().year)
+        parser.add_argument("--pay-date", help="YYYY-MM-DD (default: today)")
+        parser.add_argument("--status", default="Pending", choices=["Pending", "Paid", "Failed"])
+
+    def handle(self, *args, **options):
+        pay_date = None
+        if options["pay_date"]:
+            try:
+                pay_date = parse_date(options["pay_date"])
+            except ValueError:
+                pay_date = None
+            if pay_date is None:
+                raise CommandError("--pay-date must be YYYY-MM-DD.")
+
+        result = run_payroll(options["month"], options["year"], pay_date=pay_date, status=options["status"])
+        for failure in result["failures"]:
+            self.stderr.write(f"{failure['email']}: {failure['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Payroll {result['month']} {result['year']}: created {result['created']}, "
+            f"skipped {result['skipped']}, failed {result['failed']}"
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from accounts.task_alerts import sweep_task_alerts
+
+
+class Command(BaseCommand):
+    help = "Write overdue / due-soon task alerts and drop stale ones (run daily from cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Due-soon window in days (default: TASK_DUE_SOON_DAYS)")
+
+    def handle(self, *args, **options):
+        result = sweep_task_alerts(days=options["days"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Task alerts: created {result['created']}, removed {result['removed']}"
+        ))
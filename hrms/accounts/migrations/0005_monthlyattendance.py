@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_rename_created_by_report_email_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyAttendance',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('days_present', models.IntegerField(default=0)),
+                ('worked_minutes', models.IntegerField(default=0)),
+                ('late_arrivals', models.IntegerField(default=0)),
+                ('missing_checkouts', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('email', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_attendance', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-year', '-month'],
+                'indexes': [models.Index(fields=['year', 'month'], name='accounts_mo_year_92b42e_idx')],
+                'unique_together': {('email', 'year', 'month')},
+            },
+        ),
+    ]
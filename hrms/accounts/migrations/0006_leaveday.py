@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:51
+
+import django.db.models.deletion
+from django.conf import settings
+import datetime
+from django.db import migrations, models
+
+
+def backfill_leave_days(apps, schema_editor):
+    Leave = apps.get_model("accounts", "Leave")
+    LeaveDay = apps.get_model("accounts", "LeaveDay")
+    days = []
+    for leave in Leave.objects.filter(status="Approved").iterator():
+        for i in range((leave.end_date - leave.start_date).days + 1):
+            days.append(LeaveDay(
+                leave_id=leave.id, email_id=leave.email_id, department=leave.department,
+                leave_type=leave.leave_type, date=leave.start_date + datetime.timedelta(days=i),
+            ))
+    LeaveDay.objects.bulk_create(days, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_monthlyattendance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveDay',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('department', models.CharField(blank=True, max_length=100, null=True)),
+                ('leave_type', models.CharField(blank=True, max_length=50, null=True)),
+                ('date', models.DateField()),
+                ('email', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_days', to=settings.AUTH_USER_MODEL)),
+                ('leave', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='days', to='accounts.leave')),
+            ],
+            options={
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['date', 'department'], name='accounts_le_date_9bec25_idx'), models.Index(fields=['email', 'date'], name='accounts_le_email_i_739d21_idx')],
+                'unique_together': {('leave', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_leave_days, migrations.RunPython.noop),
+    ]
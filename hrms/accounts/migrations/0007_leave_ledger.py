@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_leaveday'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveBalance',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('leave_type', models.CharField(max_length=50)),
+                ('accrued', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('consumed', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('adjusted', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('email', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_balances', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['leave_type'],
+                'unique_together': {('email', 'leave_type')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaveLedgerEntry',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('leave_type', models.CharField(max_length=50)),
+                ('kind', models.CharField(choices=[('Accrual', 'Accrual'), ('Consumption', 'Consumption'), ('Adjustment', 'Adjustment')], max_length=20)),
+                ('days', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('period', models.CharField(blank=True, max_length=7, null=True)),
+                ('note', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('email', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_ledger', to=settings.AUTH_USER_MODEL)),
+                ('leave', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='accounts.leave')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('kind', 'Accrual')), fields=('email', 'leave_type', 'period'), name='unique_monthly_accrual')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:54
+
+from django.db import migrations, models
+
+
+CREATE_CONSTRAINT = """
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+ALTER TABLE accounts_leave ADD CONSTRAINT leave_no_overlap EXCLUDE USING gist (
+    email_id WITH =,
+    daterange(start_date, end_date, '[]') WITH &&
+) WHERE (status IN ('Pending', 'Approved'));
+"""
+
+DROP_CONSTRAINT = "ALTER TABLE accounts_leave DROP CONSTRAINT IF EXISTS leave_no_overlap;"
+
+
+def add_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return  # other backends rely on the locking transaction in apply_leave
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT a.id, b.id FROM accounts_leave a
+            JOIN accounts_leave b ON a.email_id = b.email_id AND a.id < b.id
+            WHERE a.status IN ('Pending', 'Approved') AND b.status IN ('Pending', 'Approved')
+              AND a.start_date <= b.end_date AND a.end_date >= b.start_date
+            LIMIT 20
+        """)
+        clashes = cursor.fetchall()
+    if clashes:
+        raise RuntimeError(
+            "Cannot add leave_no_overlap: overlapping Pending/Approved leaves exist "
+            f"(id pairs {clashes}). Reject or cancel one of each pair and migrate again."
+        )
+    schema_editor.execute(CREATE_CONSTRAINT)
+
+
+def remove_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_CONSTRAINT)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_leave_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leave',
+            index=models.Index(fields=['email', 'start_date', 'end_date'], name='accounts_le_email_i_619b55_idx'),
+        ),
+        migrations.RunPython(add_overlap_constraint, remove_overlap_constraint),
+    ]
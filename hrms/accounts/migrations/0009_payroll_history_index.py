@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_leave_overlap_constraint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payroll',
+            index=models.Index(fields=['email', 'year', 'month'], name='accounts_pa_email_i_4ffc1b_idx'),
+        ),
+    ]
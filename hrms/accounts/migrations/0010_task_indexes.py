@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_payroll_history_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tasktable',
+            index=models.Index(fields=['email', 'status'], name='accounts_ta_email_i_894791_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktable',
+            index=models.Index(fields=['status', 'due_date'], name='accounts_ta_status_b79fae_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:01
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_task_counters(apps, schema_editor):
+    TaskTable = apps.get_model("accounts", "TaskTable")
+    TaskStatusCount = apps.get_model("accounts", "TaskStatusCount")
+    rows = [
+        TaskStatusCount(scope="user", key=row["email"], status=row["status"], count=row["n"])
+        for row in TaskTable.objects.order_by().values("email", "status").annotate(n=Count("task_id"))
+    ] + [
+        TaskStatusCount(scope="department", key=row["department"], status=row["status"], count=row["n"])
+        for row in TaskTable.objects.exclude(department__isnull=True).exclude(department="")
+        .order_by().values("department", "status").annotate(n=Count("task_id"))
+    ]
+    TaskStatusCount.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_task_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStatusCount',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('scope', models.CharField(choices=[('user', 'user'), ('department', 'department')], max_length=20)),
+                ('key', models.CharField(max_length=255)),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['scope', 'key', 'status'],
+                'unique_together': {('scope', 'key', 'status')},
+            },
+        ),
+        migrations.RunPython(backfill_task_counters, migrations.RunPython.noop),
+    ]
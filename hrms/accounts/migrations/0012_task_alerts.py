@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_taskstatuscount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskAlert',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('overdue', 'overdue'), ('due_soon', 'due_soon')], max_length=20)),
+                ('due_date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['due_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tasktable',
+            index=models.Index(condition=models.Q(('status', 'Completed'), _negated=True), fields=['due_date'], name='task_open_due_idx'),
+        ),
+        migrations.AddField(
+            model_name='taskalert',
+            name='email',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_alerts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='taskalert',
+            name='task',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='accounts.tasktable'),
+        ),
+        migrations.AddIndex(
+            model_name='taskalert',
+            index=models.Index(fields=['email', 'due_date'], name='accounts_ta_email_i_58c0e8_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='taskalert',
+            unique_together={('task', 'kind', 'due_date')},
+        ),
+    ]
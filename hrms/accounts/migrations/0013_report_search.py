@@ -0,0 +1,56 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:04
+
+from django.db import migrations
+
+
+POSTGRES_FORWARD = """
+ALTER TABLE accounts_report ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(content, '')), 'C')
+) STORED;
+CREATE INDEX report_search_idx ON accounts_report USING GIN (search_vector);
+"""
+
+POSTGRES_BACKWARD = """
+DROP INDEX IF EXISTS report_search_idx;
+ALTER TABLE accounts_report DROP COLUMN IF EXISTS search_vector;
+"""
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE accounts_report_fts USING fts5(title, description, content, tokenize='porter')",
+    "INSERT INTO accounts_report_fts (rowid, title, description, content) "
+    "SELECT id, title, coalesce(description, ''), coalesce(content, '') FROM accounts_report",
+]
+
+SQLITE_BACKWARD = ["DROP TABLE IF EXISTS accounts_report_fts"]
+
+
+def add_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(POSTGRES_FORWARD)
+    elif vendor == "sqlite":
+        for statement in SQLITE_FORWARD:
+            schema_editor.execute(statement)
+    # other backends fall back to icontains search in accounts/report_search.py
+
+
+def remove_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(POSTGRES_BACKWARD)
+    elif vendor == "sqlite":
+        for statement in SQLITE_BACKWARD:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_task_alerts'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_report_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payroll',
+            index=models.Index(fields=['year', 'month'], name='accounts_pa_year_1ed38c_idx'),
+        ),
+    ]
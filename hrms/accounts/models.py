@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.utils import timezone
 
@@ -21,6 +21,13 @@ class UserManager(BaseUserManager):
             raise ValueError('Superuser must have is_superuser=True.')
         return self.create_user(email, role, password, **extra_fields)
 
+    def with_profile(self):
+        """Users that have a row in one of the role profile tables."""
+        return self.filter(
+            models.Q(hr__isnull=False) | models.Q(employee__isnull=False) | models.Q(ceo__isnull=False)
+            | models.Q(manager__isnull=False) | models.Q(admin__isnull=False)
+        )
+
 class User(AbstractBaseUser, PermissionsMixin):
     email = models.EmailField(primary_key=True, max_length=254)
     role = models.CharField(max_length=30)
@@ -139,6 +146,9 @@ class Leave(models.Model):
 
     class Meta:
         ordering = ['-applied_on']
+        indexes = [models.Index(fields=['email', 'start_date', 'end_date'])]
+        # On PostgreSQL overlapping Pending/Approved leaves per user are also excluded by the
+        # leave_no_overlap daterange constraint (GiST), created in migration 0008.
 
     def __str__(self):
         return f"{self.email.email} - {self.department} Leave from {self.start_date} to {self.end_date} [{self.status}]"
@@ -164,12 +174,20 @@ class Payroll(models.Model):
     class Meta:
         ordering = ['-pay_date']
         unique_together = ('email', 'month', 'year')  # Keep unique per month/year per user
+        indexes = [
+            models.Index(fields=['email', 'year', 'month']),  # per-user history by year
+            models.Index(fields=['year', 'month']),  # payroll_costs: months of a year, per-month totals
+        ]
 
     def __str__(self):
         return f"Payroll for {self.email.email} - {self.month} {self.year}"
 
-    def save(self, *args, **kwargs):
+    def calculate_net_salary(self):
         self.net_salary = (self.basic_salary + self.allowances + self.bonus) - (self.deductions + self.tax)
+        return self.net_salary
+
+    def save(self, *args, **kwargs):
+        self.calculate_net_salary()
         super().save(*args, **kwargs)
 
 class TaskTable(models.Model):
@@ -218,12 +236,24 @@ class TaskTable(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['email', 'status']),     # "my open tasks"
+            models.Index(fields=['status', 'due_date']),  # due / overdue queues
+            # only tasks that can still become overdue; used by the alert sweep
+            models.Index(fields=['due_date'], condition=~models.Q(status='Completed'), name='task_open_due_idx'),
+        ]
         verbose_name = "Task"
         verbose_name_plural = "Tasks"
 
     def __str__(self):
         return f"Task: {self.title} for {self.email.email} → {self.status}"
 
+    def save(self, *args, **kwargs):
+        # one transaction, so the row locked by the pre_save counter signal stays
+        # locked until post_save has applied the status counter deltas
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 class Report(models.Model):
     id = models.AutoField(primary_key=True)
     title = models.CharField(max_length=255)
@@ -292,3 +322,131 @@ class Notice(models.Model):
 
     def __str__(self):
         return self.title
+
+class MonthlyAttendance(models.Model):
+    """Per user per month attendance rollup, maintained from Attendance writes."""
+    id = models.AutoField(primary_key=True)
+    email = models.ForeignKey(User, on_delete=models.CASCADE, to_field='email', related_name='monthly_attendance')
+    year = models.IntegerField()
+    month = models.IntegerField()
+    days_present = models.IntegerField(default=0)
+    worked_minutes = models.IntegerField(default=0)
+    late_arrivals = models.IntegerField(default=0)
+    missing_checkouts = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-year', '-month']
+        unique_together = ('email', 'year', 'month')
+        indexes = [models.Index(fields=['year', 'month'])]
+
+    def __str__(self):
+        return f"{self.email_id} - {self.month}/{self.year}: {self.days_present} days"
+
+class LeaveDay(models.Model):
+    """One row per calendar day covered by an approved Leave (the team calendar index)."""
+    id = models.AutoField(primary_key=True)
+    leave = models.ForeignKey(Leave, on_delete=models.CASCADE, related_name='days')
+    email = models.ForeignKey(User, on_delete=models.CASCADE, to_field='email', related_name='leave_days')
+    department = models.CharField(max_length=100, null=True, blank=True)
+    leave_type = models.CharField(max_length=50, null=True, blank=True)
+    date = models.DateField()
+
+    class Meta:
+        ordering = ['date']
+        unique_together = ('leave', 'date')
+        indexes = [
+            models.Index(fields=['date', 'department']),
+            models.Index(fields=['email', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.email_id} on leave {self.date}"
+
+class LeaveLedgerEntry(models.Model):
+    """Signed movement of leave days: accruals (+), consumption (-) and manual adjustments (+/-)."""
+    KIND_CHOICES = [
+        ('Accrual', 'Accrual'),
+        ('Consumption', 'Consumption'),
+        ('Adjustment', 'Adjustment'),
+    ]
+    id = models.AutoField(primary_key=True)
+    email = models.ForeignKey(User, on_delete=models.CASCADE, to_field='email', related_name='leave_ledger')
+    leave_type = models.CharField(max_length=50)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    days = models.DecimalField(max_digits=6, decimal_places=2)
+    leave = models.ForeignKey(Leave, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    period = models.CharField(max_length=7, null=True, blank=True)  # YYYY-MM for accruals
+    note = models.CharField(max_length=255, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['email', 'leave_type', 'period'],
+                condition=models.Q(kind='Accrual'),
+                name='unique_monthly_accrual',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.email_id} {self.kind} {self.days} {self.leave_type}"
+
+class LeaveBalance(models.Model):
+    """Running totals of LeaveLedgerEntry per user and leave type."""
+    id = models.AutoField(primary_key=True)
+    email = models.ForeignKey(User, on_delete=models.CASCADE, to_field='email', related_name='leave_balances')
+    leave_type = models.CharField(max_length=50)
+    accrued = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    consumed = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    adjusted = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['leave_type']
+        unique_together = ('email', 'leave_type')
+
+    def __str__(self):
+        return f"{self.email_id} {self.leave_type}: {self.balance}"
+
+class TaskStatusCount(models.Model):
+    """Number of tasks per status for one user or one department (scope + key)."""
+    id = models.AutoField(primary_key=True)
+    scope = models.CharField(max_length=20, choices=[
+        ('user', 'user'),
+        ('department', 'department'),
+    ])
+    key = models.CharField(max_length=255)  # email or department name
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['scope', 'key', 'status']
+        unique_together = ('scope', 'key', 'status')
+
+    def __str__(self):
+        return f"{self.scope} {self.key} {self.status}: {self.count}"
+
+class TaskAlert(models.Model):
+    """Overdue / due-soon reminder written by the task alert sweep."""
+    id = models.AutoField(primary_key=True)
+    task = models.ForeignKey(TaskTable, on_delete=models.CASCADE, related_name='alerts')
+    email = models.ForeignKey(User, on_delete=models.CASCADE, to_field='email', related_name='task_alerts')
+    kind = models.CharField(max_length=20, choices=[
+        ('overdue', 'overdue'),
+        ('due_soon', 'due_soon'),
+    ])
+    due_date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['due_date']
+        unique_together = ('task', 'kind', 'due_date')
+        indexes = [
+            models.Index(fields=['email', 'due_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} task {self.task_id} for {self.email_id} (due {self.due_date})"
@@ -0,0 +1,98 @@
+import threading
+from .caching import profiles_version
+
+
+class AmbiguousNameError(Exception):
+    def __init__(self, username, candidates):
+        self.username = username
+        self.candidates = sorted(candidates)
+        super().__init__(f"'{username}' matches more than one person: {', '.join(self.candidates)}")
+
+
+def profile_models():
+    from .models import HR, Employee, CEO, Manager, Admin
+    return [HR, Employee, CEO, Manager, Admin]
+
+
+class NameIndex:
+    """Maps every prefix of every fullname token to the emails owning it.
+
+    Built from the five profile tables and kept current in this process by the
+    post_save / post_delete receivers in accounts.signals. Those receivers also
+    bump the shared profiles version, so an index built before a write in another
+    worker is rebuilt on its next lookup; a name missing from an up-to-date index
+    is a definite miss and never reaches the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prefixes = {}    # prefix -> set(email)
+        self._tokens = {}      # email -> set(token)
+        self._built = None     # profiles_version() the index was built at
+
+    def _add(self, email, fullname):
+        tokens = set((fullname or "").lower().split())
+        self._tokens[email] = tokens
+        for token in tokens:
+            for i in range(1, len(token) + 1):
+                self._prefixes.setdefault(token[:i], set()).add(email)
+
+    def _remove(self, email):
+        for token in self._tokens.pop(email, ()):
+            for i in range(1, len(token) + 1):
+                owners = self._prefixes.get(token[:i])
+                if owners is not None:
+                    owners.discard(email)
+                    if not owners:
+                        del self._prefixes[token[:i]]
+
+    def build(self):
+        version = profiles_version()  # read first: a write during the build forces another one
+        with self._lock:
+            self._prefixes, self._tokens = {}, {}
+            for model in profile_models():
+                for email, fullname in model.objects.values_list('email', 'fullname'):
+                    self._add(email, fullname)
+            self._built = version
+        print(f"[NameIndex] Indexed {len(self._tokens)} people")
+
+    def update(self, email, fullname):
+        if self._built is None:
+            return
+        with self._lock:
+            self._remove(email)
+            self._add(email, fullname)
+
+    def remove(self, email):
+        if self._built is None:
+            return
+        with self._lock:
+            self._remove(email)
+
+    def lookup(self, username):
+        """Emails of everyone with a name token starting with `username`."""
+        if self._built is None or self._built != profiles_version():
+            self.build()  # first use, or a profile changed in some worker since the last build
+        prefix = (username or "").lower().strip()
+        if not prefix:
+            return []
+        with self._lock:
+            return sorted(self._prefixes.get(prefix, ()))
+
+    def resolve(self, username):
+        """Single email for `username`, None when nobody matches.
+
+        When several people share the prefix, a person with a whole-token match
+        wins; otherwise AmbiguousNameError is raised.
+        """
+        candidates = self.lookup(username)
+        if len(candidates) <= 1:
+            return candidates[0] if candidates else None
+        prefix = username.lower().strip()
+        exact = [email for email in candidates if prefix in self._tokens.get(email, ())]
+        if len(exact) == 1:
+            return exact[0]
+        raise AmbiguousNameError(username, exact or candidates)
+
+
+name_index = NameIndex()
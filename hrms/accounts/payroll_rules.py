@@ -0,0 +1,116 @@
+from bisect import bisect_right
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+COMPUTED_FIELDS = ("allowances", "deductions", "tax")  # set by PayrollRules, never taken from clients
+CENT = Decimal("0.01")
+ZERO = Decimal("0")
+TWELVE = Decimal("12")
+
+
+def _money(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class PayrollRules:
+    """PAYROLL_RULES compiled into flat lookup tables.
+
+    Allowances and deductions become lists of (rate, cap, flat) tuples applied to
+    the monthly basic. Tax slabs become three parallel sorted tuples (lower bound,
+    marginal rate, tax already owed at that bound), so the annual tax on an income
+    is one bisect plus one multiply instead of a walk over the slabs.
+    """
+
+    def __init__(self, rules):
+        try:
+            self.allowances = [self._component(spec) for spec in rules.get("allowances", {}).values()]
+            self.deductions = [self._component(spec) for spec in rules.get("deductions", {}).values()]
+            self.standard_deduction = Decimal(str(rules.get("standard_deduction", "0")))
+            slabs = sorted((Decimal(str(start)), Decimal(str(rate))) for start, rate in rules.get("tax_slabs", []))
+        except (TypeError, ValueError, ArithmeticError) as e:
+            raise ImproperlyConfigured(f"Invalid PAYROLL_RULES: {e}")
+        if not slabs or slabs[0][0] != ZERO:
+            slabs.insert(0, (ZERO, ZERO))
+
+        owed, base = ZERO, []
+        for i, (start, rate) in enumerate(slabs):
+            base.append(owed)
+            if i + 1 < len(slabs):
+                owed += (slabs[i + 1][0] - start) * rate
+        self.bounds = tuple(start for start, _ in slabs)
+        self.rates = tuple(rate for _, rate in slabs)
+        self.base_tax = tuple(base)
+
+    @staticmethod
+    def _component(spec):
+        if not isinstance(spec, dict):
+            spec = {"rate": spec}
+        rate = Decimal(str(spec.get("rate", "0")))
+        cap = Decimal(str(spec["cap"])) if spec.get("cap") is not None else None
+        flat = Decimal(str(spec.get("flat", "0")))
+        return rate, cap, flat
+
+    @staticmethod
+    def _total(components, basic):
+        total = ZERO
+        for rate, cap, flat in components:
+            amount = basic * rate + flat
+            total += min(amount, cap) if cap is not None else amount
+        return total
+
+    def annual_tax(self, income):
+        if income <= 0:
+            return ZERO
+        i = bisect_right(self.bounds, income) - 1
+        return self.base_tax[i] + (income - self.bounds[i]) * self.rates[i]
+
+    def components(self, basic, bonus=ZERO):
+        """{allowances, deductions, tax} for one month's basic salary and bonus.
+
+        Regular pay is taxed at 1/12 of the annualised tax; the bonus is taxed in
+        full this month at the marginal rate it falls into.
+        """
+        allowances = self._total(self.allowances, basic)
+        deductions = self._total(self.deductions, basic)
+        regular = (basic + allowances - deductions) * TWELVE - self.standard_deduction
+        regular_tax = self.annual_tax(regular)
+        bonus_tax = self.annual_tax(regular + bonus) - regular_tax if bonus else ZERO
+        return {
+            "allowances": _money(allowances),
+            "deductions": _money(deductions),
+            "tax": _money(regular_tax / TWELVE + bonus_tax),
+        }
+
+    def apply(self, payrolls):
+        """Fill allowances/deductions/tax/net_salary on a batch of (unsaved) Payroll objects."""
+        computed = {}  # many employees share a salary band
+        for payroll in payrolls:
+            key = (Decimal(str(payroll.basic_salary)), Decimal(str(payroll.bonus or 0)))
+            if key not in computed:
+                computed[key] = self.components(*key)
+            for field, value in computed[key].items():
+                setattr(payroll, field, value)
+            payroll.basic_salary, payroll.bonus = key
+            payroll.calculate_net_salary()
+        return payrolls
+
+
+_rules = None
+_rules_source = None
+
+
+def get_payroll_rules():
+    """Compiled settings.PAYROLL_RULES, or None when salary components are entered manually."""
+    global _rules, _rules_source
+    source = getattr(settings, "PAYROLL_RULES", None)
+    if source is None:
+        return None
+    if source is not _rules_source:
+        _rules, _rules_source = PayrollRules(source), source
+    return _rules
+
+
+def supplied_computed_fields(data):
+    """COMPUTED_FIELDS a client sent (non-null) although PAYROLL_RULES computes them."""
+    return [field for field in COMPUTED_FIELDS if data.get(field) is not None]
@@ -0,0 +1,109 @@
+from decimal import Decimal, InvalidOperation
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+from .models import User, Payroll
+from .payroll_rules import get_payroll_rules, supplied_computed_fields
+from .caching import bump_payroll_version
+
+SALARY_FIELDS = ["basic_salary", "allowances", "deductions", "bonus", "tax"]
+CARRIED_FIELDS = ["basic_salary", "allowances", "deductions", "tax"]  # bonus is per month
+
+
+def latest_payrolls(emails):
+    """Each user's most recent Payroll row, fetched in one statement."""
+    latest_id = Payroll.objects.filter(email=OuterRef('email')).order_by('-pay_date', '-id').values('id')[:1]
+    rows = Payroll.objects.filter(email__in=emails, id=Subquery(latest_id)).values('email', *CARRIED_FIELDS)
+    return {row.pop('email'): row for row in rows}
+
+
+def lock_users(emails):
+    """Hold the users' rows until the surrounding transaction ends, so payroll writers
+    (run_payroll, create_payroll) take turns instead of racing on the (email, month, year) check."""
+    if connection.vendor == "sqlite":
+        # No row locks in SQLite: a no-op write takes the database write lock up front.
+        User.objects.filter(email__in=emails).update(role=F('role'))
+    else:
+        list(User.objects.select_for_update().filter(email__in=emails).values_list('email', flat=True))
+
+
+def _decimal(value):
+    return Decimal(str(value)).quantize(Decimal("0.01"))
+
+
+def run_payroll(month, year, pay_date=None, overrides=None, status="Pending", emails=None):
+    """Create Payroll rows for every active profiled user for month/year in one transaction.
+
+    Salary components come from `overrides[email]` when given, otherwise they are
+    carried forward from the user's latest payroll (bonus resets to 0); with
+    PAYROLL_RULES configured only basic_salary and bonus are used, and overrides
+    that set allowances, deductions or tax are rejected. Users that
+    already have a payroll for the period are skipped; users with no salary data
+    (or invalid overrides) are reported as failed. Runs for the same users are
+    serialized on the user rows, so `created` counts only this run's rows.
+    """
+    overrides = overrides or {}
+    pay_date = pay_date or timezone.localdate()
+
+    users = User.objects.with_profile().filter(is_active=True)
+    if emails is not None:
+        users = users.filter(email__in=emails)
+    users = list(users.values_list('email', flat=True))
+
+    existing = set(
+        Payroll.objects.filter(email__in=users, month=month, year=year).values_list('email', flat=True)
+    )
+    pending = [email for email in users if email not in existing]
+    previous = latest_payrolls([email for email in pending if email not in overrides])
+
+    rules = get_payroll_rules()
+    rows, failed = [], []
+    for email in pending:
+        source = overrides.get(email, previous.get(email))
+        if source is None:
+            failed.append({"email": email, "error": "No salary data (no override and no previous payroll)."})
+            continue
+        if not isinstance(source, dict):
+            failed.append({"email": email, "error": "Override must be an object of salary components."})
+            continue
+        supplied = supplied_computed_fields(source) if rules is not None and email in overrides else []
+        if supplied:
+            failed.append({"email": email, "error": f"{', '.join(supplied)} are computed from PAYROLL_RULES."})
+            continue
+        try:
+            components = {field: _decimal(source.get(field, 0) or 0) for field in SALARY_FIELDS}
+        except (InvalidOperation, TypeError, ValueError):
+            failed.append({"email": email, "error": "Salary components must be numbers."})
+            continue
+        rows.append(Payroll(email_id=email, month=month, year=year, pay_date=pay_date, status=status, **components))
+
+    if rules is not None:
+        rules.apply(rows)  # allowances, deductions and tax come from PAYROLL_RULES
+    else:
+        for payroll in rows:
+            payroll.calculate_net_salary()
+
+    with transaction.atomic():
+        emails = [payroll.email_id for payroll in rows]
+        lock_users(emails)
+        # another writer may have created some of these while we were computing
+        raced = set(
+            Payroll.objects.filter(email__in=emails, month=month, year=year).values_list('email', flat=True)
+        ) if rows else set()
+        rows = [payroll for payroll in rows if payroll.email_id not in raced]
+        # ignore_conflicts also covers writers that don't take the user lock (admin, shell)
+        Payroll.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+        created = Payroll.objects.filter(
+            email__in=[payroll.email_id for payroll in rows], month=month, year=year,
+        ).count() if rows else 0
+        if created:
+            bump_payroll_version(year, month)  # bulk_create skips post_save
+
+    return {
+        "month": month,
+        "year": year,
+        "created": created,
+        "skipped": len(existing) + len(raced) + (len(rows) - created),
+        "failed": len(failed),
+        "failures": failed,
+    }
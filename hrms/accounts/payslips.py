@@ -0,0 +1,200 @@
+import os
+import glob
+import json
+import time
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.db.models.functions import Coalesce
+from PIL import Image, ImageDraw, ImageFont
+
+PAGE_SIZE = (1240, 1754)  # A4 at 150 dpi
+MARGIN = 100
+
+FULLNAME = Coalesce(
+    "email__employee__fullname", "email__hr__fullname", "email__manager__fullname",
+    "email__ceo__fullname", "email__admin__fullname",
+)
+
+EARNINGS = [("Basic salary", "basic_salary"), ("Allowances", "allowances"), ("Bonus", "bonus")]
+DEDUCTIONS = [("Deductions", "deductions"), ("Tax", "tax")]
+
+
+def with_fullname(queryset):
+    """Payroll queryset annotated with the employee's name from whichever profile they have."""
+    return queryset.annotate(fullname=FULLNAME)
+
+
+def payslip_data(payroll):
+    """Everything printed on the slip, as plain strings (picklable for the pool)."""
+    return {
+        "id": payroll.id,
+        "fullname": getattr(payroll, "fullname", None) or payroll.email_id,
+        "email": payroll.email_id,
+        "month": payroll.month,
+        "year": str(payroll.year),
+        "pay_date": str(payroll.pay_date),
+        "status": payroll.status,
+        **{field: str(getattr(payroll, field)) for _, field in EARNINGS + DEDUCTIONS + [("", "net_salary")]},
+    }
+
+
+def payslip_path(data):
+    """<PAYSLIP_DIR>/payslip_<id>_<fingerprint>.pdf; the fingerprint changes whenever the row does."""
+    fingerprint = hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()[:16]
+    return os.path.join(str(settings.PAYSLIP_DIR), f"payslip_{data['id']}_{fingerprint}.pdf")
+
+
+# =====================
+# Runs inside the pool processes
+# =====================
+def _font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except (TypeError, OSError):  # Pillow without FreeType
+        return ImageFont.load_default()
+
+
+def render_payslip(data, path):
+    """Draw the slip and write it atomically to `path`, removing older versions of it."""
+    page = Image.new("RGB", PAGE_SIZE, "white")
+    draw = ImageDraw.Draw(page)
+    title, body = _font(44), _font(28)
+    right = PAGE_SIZE[0] - MARGIN
+
+    y = MARGIN
+    draw.text((MARGIN, y), "Payslip", font=title, fill="black")
+    y += 90
+    for label, value in [("Employee", data["fullname"]), ("Email", data["email"]),
+                         ("Period", f"{data['month']} {data['year']}"), ("Pay date", data["pay_date"]),
+                         ("Status", data["status"])]:
+        draw.text((MARGIN, y), label, font=body, fill="gray")
+        draw.text((MARGIN + 250, y), value, font=body, fill="black")
+        y += 45
+
+    for heading, rows in [("Earnings", EARNINGS), ("Deductions", DEDUCTIONS)]:
+        y += 40
+        draw.text((MARGIN, y), heading, font=body, fill="black")
+        y += 45
+        draw.line((MARGIN, y, right, y), fill="black", width=2)
+        y += 15
+        for label, field in rows:
+            draw.text((MARGIN, y), label, font=body, fill="black")
+            draw.text((right, y), data[field], font=body, fill="black", anchor="ra")
+            y += 45
+
+    y += 40
+    draw.line((MARGIN, y, right, y), fill="black", width=3)
+    y += 20
+    draw.text((MARGIN, y), "Net salary", font=title, fill="black")
+    draw.text((right, y), data["net_salary"], font=title, fill="black", anchor="ra")
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    page.save(tmp_path, format="PDF", resolution=150)
+    os.replace(tmp_path, path)
+    for stale in glob.glob(os.path.join(os.path.dirname(path), f"payslip_{data['id']}_*.pdf")):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass
+    return path
+
+
+# =====================
+# Used by the web process and render_payslips
+# =====================
+class PayslipRenderer:
+    """Renders payslips in a process pool so web workers only ever serve files.
+
+    Requests for a slip that is already being rendered share the same future.
+    Each gunicorn worker has its own pool, so a render is also claimed on disk
+    (`<path>.rendering`) and other processes wait for it instead of resubmitting;
+    a failed render leaves `<path>.failed` with the error until a retry.
+    """
+
+    def __init__(self, workers):
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def submit(self, data, retry=False):
+        """Queue rendering unless the current version is on disk, failed, or claimed elsewhere.
+
+        Returns (path, future or None). With retry=True an earlier failure is cleared first.
+        """
+        path = payslip_path(data)
+        if os.path.exists(path):
+            return path, None
+        if retry:
+            self._remove(path + ".failed")
+        elif self.failure(path) is not None:
+            return path, None
+        with self._lock:
+            future = self._pending.get(path)
+            if future is None:
+                if not self._claim(path):
+                    return path, None  # another process is rendering it
+                future = self._executor.submit(render_payslip, data, path)
+                self._pending[path] = future
+                future.add_done_callback(lambda done: self._finished(path, done))
+        return path, future
+
+    @staticmethod
+    def failure(path):
+        """Error message of the last failed render of `path`, or None."""
+        try:
+            with open(path + ".failed") as fh:
+                return fh.read() or "unknown error"
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _claim(path):
+        claim = path + ".rendering"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for _ in range(2):
+            try:
+                os.close(os.open(claim, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(claim) < settings.PAYSLIP_RENDER_TIMEOUT:
+                        return False
+                except FileNotFoundError:
+                    continue
+                PayslipRenderer._remove(claim)  # left behind by a process that died mid-render
+        return False
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _finished(self, path, future):
+        error = future.exception()
+        if error is not None:
+            with open(path + ".failed", "w") as fh:
+                fh.write(str(error) or type(error).__name__)
+            print(f"[payslips] rendering {os.path.basename(path)} failed: {error!r}")
+        self._remove(path + ".rendering")
+        with self._lock:
+            self._pending.pop(path, None)
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_payslip_renderer():
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = PayslipRenderer(workers=settings.PAYSLIP_WORKERS)
+    return _renderer
@@ -0,0 +1,93 @@
+import re
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from .models import Report
+
+# Full-text index per backend (migration 0013):
+# - PostgreSQL: generated `search_vector` tsvector column (title A, description B, content C) + GIN index
+# - SQLite: FTS5 table accounts_report_fts, rowid = report id, synced by signals on Report
+FTS_TABLE = "accounts_report_fts"
+FTS_WEIGHTS = "10.0, 5.0, 1.0"  # title, description, content
+
+
+def fts_enabled():
+    return connection.vendor == "sqlite"
+
+
+def index_reports(reports):
+    """Insert or replace the FTS5 rows of the given reports (no-op outside SQLite)."""
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(report.id,) for report in reports]
+        )
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, description, content) VALUES (%s, %s, %s, %s)",
+            [(report.id, report.title, report.description or "", report.content or "") for report in reports],
+        )
+
+
+def unindex_reports(report_ids):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(report_id,) for report_id in report_ids])
+
+
+def fts5_query(text):
+    """User text -> FTS5 MATCH expression: every word must appear (no FTS syntax errors)."""
+    return " ".join(f'"{term}"' for term in re.findall(r"\w+", text))
+
+
+def search_reports(text, email=None, date_from=None, date_to=None, offset=0, limit=20):
+    """Reports matching `text`, best match first, as a list with a `rank` attribute."""
+    filters = Q()
+    if email:
+        filters &= Q(email=email)
+    if date_from:
+        filters &= Q(date__gte=date_from)
+    if date_to:
+        filters &= Q(date__lte=date_to)
+
+    if connection.vendor == "postgresql":
+        query = "websearch_to_tsquery('english', %s)"
+        return list(
+            Report.objects.filter(filters)
+            .filter(RawSQL(f"search_vector @@ {query}", (text,), output_field=BooleanField()))
+            .annotate(rank=RawSQL(f"ts_rank_cd(search_vector, {query})", (text,), output_field=FloatField()))
+            .order_by('-rank', '-date', 'id')[offset:offset + limit]
+        )
+
+    if fts_enabled():
+        match = fts5_query(text)
+        if not match:
+            return []
+        where, params = [f"{FTS_TABLE} MATCH %s"], [match]
+        if email:
+            where.append("r.email_id = %s")
+            params.append(email)
+        if date_from:
+            where.append("r.date >= %s")
+            params.append(date_from)
+        if date_to:
+            where.append("r.date <= %s")
+            params.append(date_to)
+        return list(Report.objects.raw(
+            f"SELECT r.*, -bm25({FTS_TABLE}, {FTS_WEIGHTS}) AS rank "
+            f"FROM {FTS_TABLE} JOIN accounts_report r ON r.id = {FTS_TABLE}.rowid "
+            f"WHERE {' AND '.join(where)} "
+            f"ORDER BY rank DESC, r.date DESC, r.id LIMIT %s OFFSET %s",
+            params + [limit, offset],
+        ))
+
+    words = re.findall(r"\w+", text)
+    for word in words:
+        filters &= Q(title__icontains=word) | Q(description__icontains=word) | Q(content__icontains=word)
+    if not words:
+        return []
+    reports = list(Report.objects.filter(filters).order_by('-date', 'id')[offset:offset + limit])
+    for report in reports:
+        report.rank = None
+    return reports
@@ -0,0 +1,120 @@
+import calendar
+import datetime
+from collections import defaultdict
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+from .models import Attendance, MonthlyAttendance, LeaveDay
+
+
+def shift_start():
+    hours, minutes = settings.ATTENDANCE_SHIFT_START.split(":")
+    return datetime.time(int(hours), int(minutes))
+
+
+def month_bounds(year, month):
+    return datetime.date(year, month, 1), datetime.date(year, month, calendar.monthrange(year, month)[1])
+
+
+def worked_minutes(check_in, check_out):
+    if not check_in or not check_out or check_out < check_in:
+        return 0
+    start = check_in.hour * 60 + check_in.minute
+    end = check_out.hour * 60 + check_out.minute
+    return end - start
+
+
+def summarize(rows, late_after=None):
+    """Fold (email, date, check_in, check_out) rows into {(email, year, month): counters}."""
+    late_after = late_after or shift_start()
+    buckets = defaultdict(lambda: {"days_present": 0, "worked_minutes": 0, "late_arrivals": 0, "missing_checkouts": 0})
+    for email, date, check_in, check_out in rows:
+        bucket = buckets[(email, date.year, date.month)]
+        if check_in is None:
+            continue
+        bucket["days_present"] += 1
+        bucket["worked_minutes"] += worked_minutes(check_in, check_out)
+        if check_in > late_after:
+            bucket["late_arrivals"] += 1
+        if check_out is None:
+            bucket["missing_checkouts"] += 1
+    return buckets
+
+
+def _write(buckets):
+    MonthlyAttendance.objects.bulk_create(
+        [
+            MonthlyAttendance(email_id=email, year=year, month=month, **counters)
+            for (email, year, month), counters in buckets.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['email', 'year', 'month'],
+        update_fields=['days_present', 'worked_minutes', 'late_arrivals', 'missing_checkouts', 'updated_at'],
+        batch_size=500,
+    )
+
+
+def refresh_attendance_rollup(keys):
+    """Recompute the rollup rows for the given (email, year, month) keys.
+
+    Keys are grouped per month so a kiosk batch touching hundreds of users
+    costs one read of that month's rows for those users and one upsert.
+    """
+    by_month = defaultdict(set)
+    for email, year, month in keys:
+        by_month[(year, month)].add(email)
+
+    for (year, month), emails in by_month.items():
+        first, last = month_bounds(year, month)
+        rows = Attendance.objects.filter(email__in=emails, date__range=(first, last)) \
+            .values_list('email', 'date', 'check_in', 'check_out')
+        buckets = summarize(rows)
+        empty = emails - {email for email, _, _ in buckets}
+        if empty:
+            MonthlyAttendance.objects.filter(email__in=empty, year=year, month=month).delete()
+        if buckets:
+            _write(buckets)
+
+
+def rebuild_attendance_rollup(start, end, chunk_size=2000):
+    """Rebuild every month touched by [start, end] from the raw Attendance table."""
+    first, _ = month_bounds(start.year, start.month)
+    _, last = month_bounds(end.year, end.month)
+    months = Q()
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        months |= Q(year=year, month=month)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    MonthlyAttendance.objects.filter(months).delete()
+    rows = Attendance.objects.filter(date__range=(first, last)) \
+        .order_by() \
+        .values_list('email', 'date', 'check_in', 'check_out') \
+        .iterator(chunk_size=chunk_size)
+    buckets = summarize(rows)
+    if buckets:
+        _write(buckets)
+    return len(buckets)
+
+
+def leave_days(leave):
+    start, end = leave.start_date, leave.end_date
+    if isinstance(start, str):
+        start, end = parse_date(start), parse_date(end)
+    return [
+        LeaveDay(leave_id=leave.id, email_id=leave.email_id, department=leave.department,
+                 leave_type=leave.leave_type, date=start + datetime.timedelta(days=i))
+        for i in range((end - start).days + 1)
+    ]
+
+
+def sync_leave_days(leaves):
+    """Make LeaveDay match the given leaves: one row per day for Approved ones, none otherwise."""
+    leaves = list(leaves)
+    if not leaves:
+        return
+    LeaveDay.objects.filter(leave_id__in=[leave.id for leave in leaves]).delete()
+    LeaveDay.objects.bulk_create(
+        [day for leave in leaves if leave.status == "Approved" for day in leave_days(leave)],
+        batch_size=1000,
+    )
@@ -1,6 +1,12 @@
-from django.db.models.signals import post_delete
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
 from django.dispatch import receiver
-from .models import HR, Employee, CEO, Manager, Admin, Attendance, Leave, User
+from django.utils.dateparse import parse_date
+from .models import HR, Employee, CEO, Manager, Admin, Attendance, Leave, User, Payroll, TaskTable, Report
+from .name_index import name_index
+from .caching import bump_attendance_version, bump_payroll_version, bump_payroll_epoch, bump_profiles_version
+from .rollups import refresh_attendance_rollup, sync_leave_days
+from .task_counters import counter_state, locked_state, record_task_changes
+from .report_search import index_reports, unindex_reports
 
 @receiver(post_delete, sender=HR)
 @receiver(post_delete, sender=Employee)
@@ -16,3 +22,86 @@ def delete_user_on_child_delete(sender, instance, **kwargs):
         print(f"[Signal] Deleted User {user.email} because {sender.__name__} row was deleted.")
     except Exception as e:
         print(f"[Signal ERROR] Failed to delete User: {e}")
+
+@receiver(post_save, sender=HR)
+@receiver(post_save, sender=Employee)
+@receiver(post_save, sender=CEO)
+@receiver(post_save, sender=Manager)
+@receiver(post_save, sender=Admin)
+def update_name_index(sender, instance, **kwargs):
+    name_index.update(instance.email_id, instance.fullname)
+    bump_profiles_version()  # other workers rebuild their index
+
+@receiver(post_delete, sender=HR)
+@receiver(post_delete, sender=Employee)
+@receiver(post_delete, sender=CEO)
+@receiver(post_delete, sender=Manager)
+@receiver(post_delete, sender=Admin)
+def remove_from_name_index(sender, instance, **kwargs):
+    name_index.remove(instance.email_id)
+    bump_profiles_version()
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def update_attendance_rollup(sender, instance, **kwargs):
+    date = parse_date(instance.date) if isinstance(instance.date, str) else instance.date
+    refresh_attendance_rollup({(instance.email_id, date.year, date.month)})
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def invalidate_attendance_cache(sender, instance, **kwargs):
+    bump_attendance_version()
+
+@receiver(post_save, sender=Leave)
+def update_leave_days(sender, instance, **kwargs):
+    sync_leave_days([instance])
+
+@receiver(post_save, sender=Payroll)
+@receiver(post_delete, sender=Payroll)
+def invalidate_payroll_totals(sender, instance, **kwargs):
+    bump_payroll_version(instance.year, instance.month)
+
+@receiver(post_save, sender=HR)
+@receiver(post_save, sender=Employee)
+@receiver(post_save, sender=Manager)
+@receiver(post_delete, sender=HR)
+@receiver(post_delete, sender=Employee)
+@receiver(post_delete, sender=Manager)
+def invalidate_payroll_departments(sender, instance, **kwargs):
+    # payroll totals are grouped by the profile's department
+    bump_payroll_epoch()
+
+COUNTED_FIELDS = {"email", "department", "status"}
+
+@receiver(pre_save, sender=TaskTable)
+def remember_task_state(sender, instance, update_fields=None, **kwargs):
+    # Read what the counters hold from the locked row, not from the instance: another
+    # request may have changed it since this instance was loaded. TaskTable.save runs
+    # in a transaction, so the lock is held until update_task_counters has run.
+    if instance._state.adding or (update_fields is not None and not COUNTED_FIELDS & set(update_fields)):
+        instance._counted_state = None if instance._state.adding else "unchanged"
+    else:
+        instance._counted_state = locked_state(instance.pk)
+
+@receiver(post_save, sender=TaskTable)
+def update_task_counters(sender, instance, **kwargs):
+    if instance._counted_state != "unchanged":
+        record_task_changes([(instance._counted_state, counter_state(instance))])
+
+@receiver(pre_delete, sender=TaskTable)
+def forget_task_state(sender, instance, **kwargs):
+    # deletes already run in a transaction (Collector.delete)
+    instance._counted_state = locked_state(instance.pk)
+
+@receiver(post_delete, sender=TaskTable)
+def remove_from_task_counters(sender, instance, **kwargs):
+    record_task_changes([(instance._counted_state, None)])
+
+@receiver(post_save, sender=Report)
+def update_report_search(sender, instance, **kwargs):
+    # keeps the SQLite FTS5 table in step; PostgreSQL maintains its tsvector column itself
+    index_reports([instance])
+
+@receiver(post_delete, sender=Report)
+def remove_report_search(sender, instance, **kwargs):
+    unindex_reports([instance.id])
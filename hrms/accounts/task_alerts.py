@@ -0,0 +1,49 @@
+import datetime
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import TaskTable, TaskAlert
+
+
+def open_tasks_due_by(date):
+    """Non-completed tasks due on or before `date`; matches task_open_due_idx exactly."""
+    return TaskTable.objects.filter(due_date__lte=date).exclude(status="Completed")
+
+
+def sweep_task_alerts(today=None, days=None):
+    """Write overdue / due-soon alerts for open tasks and drop alerts that no longer apply.
+
+    A task due before `today` gets an "overdue" alert; one due within `days` days
+    gets "due_soon". Existing alerts are kept (one per task, kind and due date),
+    so the sweep can run as often as needed. Returns {"created", "removed"}.
+    """
+    today = today or timezone.localdate()
+    days = settings.TASK_DUE_SOON_DAYS if days is None else days
+    horizon = today + datetime.timedelta(days=days)
+
+    alerts = [
+        TaskAlert(task_id=task_id, email_id=email, due_date=due_date,
+                  kind="overdue" if due_date < today else "due_soon")
+        for task_id, email, due_date in open_tasks_due_by(horizon).order_by()
+        .values_list('task_id', 'email', 'due_date').iterator(chunk_size=2000)
+    ]
+
+    with transaction.atomic():
+        # completed, re-dated or reassigned tasks, and due-soon alerts for tasks now overdue
+        removed, _ = TaskAlert.objects.filter(
+            Q(task__status="Completed")
+            | Q(task__due_date__isnull=True)
+            | ~Q(task__due_date=F('due_date'))
+            | ~Q(task__email=F('email'))
+            | Q(kind="due_soon", due_date__lt=today)
+        ).delete()
+        # only candidates without an alert yet (candidates are all due by the horizon)
+        existing = set(
+            TaskAlert.objects.filter(due_date__lte=horizon).values_list('task_id', 'kind', 'due_date')
+            .iterator(chunk_size=2000)
+        )
+        new = [alert for alert in alerts if (alert.task_id, alert.kind, alert.due_date) not in existing]
+        # ignore_conflicts covers a sweep running at the same time
+        TaskAlert.objects.bulk_create(new, batch_size=1000, ignore_conflicts=True)
+    return {"created": len(new), "removed": removed}
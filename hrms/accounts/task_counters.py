@@ -0,0 +1,83 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Count, F, Q
+from .models import TaskTable, TaskStatusCount
+
+TASK_STATUSES = [value for value, _ in TaskTable._meta.get_field('status').choices]
+
+
+def counter_state(task):
+    """(email, department, status) as far as the counters are concerned."""
+    return (task.email_id, task.department or None, task.status)
+
+
+def locked_state(task_id):
+    """counter_state of the stored row, locked until the transaction ends (None if missing)."""
+    row = TaskTable.objects.select_for_update().filter(task_id=task_id) \
+        .values_list('email', 'department', 'status').first()
+    return (row[0], row[1] or None, row[2]) if row else None
+
+
+def _keys(state):
+    email, department, status = state
+    keys = [("user", email, status)]
+    if department:
+        keys.append(("department", department, status))
+    return keys
+
+
+def state_deltas(changes):
+    """Counter deltas for [(old_state or None, new_state or None), ...]."""
+    deltas = Counter()
+    for old, new in changes:
+        if old == new:
+            continue
+        if old:
+            deltas.update({key: -1 for key in _keys(old)})
+        if new:
+            deltas.update({key: 1 for key in _keys(new)})
+    return deltas
+
+
+def apply_deltas(deltas):
+    """Add each delta to its counter row (creating missing rows), one UPDATE per distinct delta."""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with transaction.atomic():
+        TaskStatusCount.objects.bulk_create(
+            [TaskStatusCount(scope=scope, key=key, status=status) for scope, key, status in deltas],
+            ignore_conflicts=True,
+        )
+        by_delta = {}
+        for (scope, key, status), delta in deltas.items():
+            by_delta[delta] = by_delta.get(delta, Q()) | Q(scope=scope, key=key, status=status)
+        for delta, condition in by_delta.items():
+            TaskStatusCount.objects.filter(condition).update(count=F('count') + delta)
+
+
+def record_task_changes(changes):
+    apply_deltas(state_deltas(changes))
+
+
+def rebuild_task_counters():
+    """Recount every counter from TaskTable; returns the number of counter rows written."""
+    rows = [
+        TaskStatusCount(scope="user", key=row['email'], status=row['status'], count=row['n'])
+        for row in TaskTable.objects.order_by().values('email', 'status').annotate(n=Count('task_id'))
+    ] + [
+        TaskStatusCount(scope="department", key=row['department'], status=row['status'], count=row['n'])
+        for row in TaskTable.objects.exclude(department__isnull=True).exclude(department="")
+        .order_by().values('department', 'status').annotate(n=Count('task_id'))
+    ]
+    with transaction.atomic():
+        TaskStatusCount.objects.all().delete()
+        TaskStatusCount.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def task_summary(scope, key):
+    """{status: count} for one user or department, every status present."""
+    counts = dict.fromkeys(TASK_STATUSES, 0)
+    counts.update(TaskStatusCount.objects.filter(scope=scope, key=key).values_list('status', 'count'))
+    return counts
@@ -1,3 +1,659 @@
-from django.test import TestCase
+import json
+import datetime
+from decimal import Decimal
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from .models import User, Employee, Leave, TaskTable, Attendance, TaskAlert, Report
+from . import ledger, caching
+from .task_counters import task_summary
+from .views import LEAVE_OVERLAP_ERROR
+from .name_index import NameIndex
+from .task_alerts import sweep_task_alerts
 
-# Create your tests here.
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def make_employee(email, department="Engineering"):
+    user = User.objects.create_user(email, "Employee", "password")
+    Employee.objects.create(email=user, fullname=email.split("@")[0], department=department)
+    return user
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class BulkLeaveStatusTests(TestCase):
+    def setUp(self):
+        self.user = make_employee("ann@example.com")
+        ledger.post_entry(self.user.email, "Casual", "Adjustment", Decimal("10"), note="opening")
+        self.leave = Leave.objects.create(
+            email=self.user, department="Engineering", leave_type="Casual",
+            start_date="2026-03-02", end_date="2026-03-04",
+        )
+
+    def patch(self, body):
+        return self.client.patch("/api/accounts/bulk_update_leave/", json.dumps(body), content_type="application/json")
+
+    def test_duplicate_ids_are_applied_once(self):
+        response = self.patch({"leave_ids": [self.leave.id, self.leave.id], "status": "Approved"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["result"] for r in response.json()["results"]], ["updated", "duplicate"])
+        self.assertEqual(ledger.get_balance(self.user.email, "Casual"), Decimal("7"))
+
+        response = self.patch({"leave_ids": [self.leave.id, self.leave.id], "status": "Cancelled"})
+        self.assertEqual(response.json()["updated"], 1)
+        # one reversal, not two
+        self.assertEqual(ledger.get_balance(self.user.email, "Casual"), Decimal("10"))
+
+    def test_non_integer_ids_are_reported_per_item(self):
+        response = self.patch({"leave_ids": [[1], "x", True, self.leave.id], "status": "Rejected"})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([r["result"] for r in results], ["invalid", "invalid", "invalid", "updated"])
+        self.leave.refresh_from_db()
+        self.assertEqual(self.leave.status, "Rejected")
+
+    def test_non_object_body_is_rejected(self):
+        self.assertEqual(self.patch([self.leave.id]).status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class LeaveLedgerTests(TestCase):
+    def setUp(self):
+        self.user = make_employee("bob@example.com")
+
+    def apply(self, start, end, leave_type="Casual"):
+        body = {"email": self.user.email, "leave_type": leave_type, "start_date": start, "end_date": end,
+                "department": "Engineering", "reason": "trip"}
+        return self.client.post("/api/accounts/apply_leave/", json.dumps(body), content_type="application/json")
+
+    def adjust(self, body):
+        return self.client.post("/api/accounts/adjust_leave_balance/", json.dumps(body),
+                                content_type="application/json")
+
+    def test_apply_without_ledger_skips_balance_check(self):
+        self.assertFalse(ledger.has_ledger(self.user.email, "Casual"))
+        self.assertEqual(self.apply("2026-03-02", "2026-03-04").status_code, 201)
+
+    def test_apply_checks_balance_once_ledger_exists(self):
+        ledger.post_opening_balances({"Casual": Decimal("2")})
+        self.assertEqual(ledger.get_balance(self.user.email, "Casual"), Decimal("2"))
+        self.assertEqual(self.apply("2026-03-02", "2026-03-04").status_code, 400)
+        self.assertEqual(self.apply("2026-03-02", "2026-03-03").status_code, 201)
+
+    def test_opening_balances_are_posted_once(self):
+        self.assertEqual(ledger.post_opening_balances({"Casual": Decimal("5")}), {"Casual": 1})
+        self.assertEqual(ledger.post_opening_balances({"Casual": Decimal("5")}), {"Casual": 0})
+        self.assertEqual(ledger.get_balance(self.user.email, "Casual"), Decimal("5"))
+
+    def test_status_change_debits_and_reverses(self):
+        ledger.post_opening_balances({"Casual": Decimal("10")})
+        leave = Leave.objects.create(email=self.user, department="Engineering", leave_type="Casual",
+                                     start_date="2026-03-02", end_date="2026-03-04")
+        url = f"/api/accounts/update_leave/{leave.id}/"
+        for status, expected in [("Approved", "7"), ("Approved", "7"), ("Cancelled", "10")]:
+            response = self.client.patch(url, json.dumps({"status": status}), content_type="application/json")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(ledger.get_balance(self.user.email, "Casual"), Decimal(expected))
+
+    def test_adjust_rejects_bad_input(self):
+        for body in [[1, 2], {"email": self.user.email, "leave_type": "Casual", "days": "NaN"},
+                     {"email": self.user.email, "leave_type": "Casual", "days": "Infinity"},
+                     {"email": self.user.email, "leave_type": "Casual", "days": "1.234"},
+                     {"email": [self.user.email], "leave_type": "Casual", "days": 1}]:
+            self.assertEqual(self.adjust(body).status_code, 400, body)
+        self.assertEqual(self.adjust({"email": self.user.email, "leave_type": "Casual", "days": "1.5"}).status_code,
+                         200)
+        self.assertEqual(ledger.get_balance(self.user.email, "Casual"), Decimal("1.5"))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class BulkTaskTests(TestCase):
+    def setUp(self):
+        self.user = make_employee("cat@example.com")
+        self.task = TaskTable.objects.create(email=self.user, title="Write report", start_date="2026-03-02")
+
+    def send(self, method, url, tasks):
+        return getattr(self.client, method)(url, json.dumps({"tasks": tasks}), content_type="application/json")
+
+    def test_create_reports_non_string_users_per_item(self):
+        response = self.send("post", "/api/accounts/bulk_create_tasks/", [
+            {"email": [self.user.email], "title": "A", "start_date": "2026-03-02"},
+            {"email": self.user.email, "assigned_by": {"x": 1}, "title": "B", "start_date": "2026-03-02"},
+            {"email": self.user.email, "title": "C", "start_date": "2026-03-02"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([r["result"] for r in results], ["error", "error", "created"])
+        self.assertIn("email", results[0]["errors"])
+        self.assertIn("assigned_by", results[1]["errors"])
+
+    def test_update_reports_bad_task_ids_per_item(self):
+        response = self.send("patch", "/api/accounts/bulk_update_tasks/", [
+            {"task_id": [self.task.task_id], "title": "x"},
+            {"task_id": {"id": 1}, "title": "x"},
+            {"task_id": True, "title": "x"},
+            "nope",
+            {"task_id": self.task.task_id + 100, "title": "x"},
+            {"task_id": self.task.task_id, "email": [1]},
+            {"task_id": self.task.task_id, "title": "Renamed"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["result"] for r in response.json()["results"]],
+                         ["error", "error", "error", "error", "not_found", "error", "updated"])
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.title, "Renamed")
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AttendanceCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_employee("dan@example.com")
+
+    def get(self, **headers):
+        return self.client.get("/api/accounts/today_attendance/", headers=headers)
+
+    def check_in(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(email=self.user, date=timezone.localdate(), check_in="09:00")
+
+    def test_unchanged_snapshot_is_not_modified(self):
+        etag = self.get()["ETag"]
+        self.assertEqual(self.get(**{"If-None-Match": etag}).status_code, 304)
+
+    def test_write_changes_etag(self):
+        etag = self.get()["ETag"]
+        self.check_in()
+        response = self.get(**{"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.json()["attendances"]), 1)
+
+    def test_every_bump_moves_the_version(self):
+        version = caching.attendance_version()
+        caching._bump(caching.ATTENDANCE_VERSION_KEY)
+        caching._bump(caching.ATTENDANCE_VERSION_KEY)
+        self.assertEqual(caching.attendance_version(), version + 2)
+
+    def test_no_last_modified_during_the_second_of_a_write(self):
+        with mock.patch("accounts.caching.time.time", return_value=1000.2):
+            caching._bump(caching.ATTENDANCE_VERSION_KEY)
+            self.assertIsNone(caching.attendance_last_modified())
+        with mock.patch("accounts.caching.time.time", return_value=1001.5):
+            self.assertEqual(caching.attendance_last_modified().timestamp(), 1001)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, PAYROLL_RULES=None)
+class RunPayrollTests(TestCase):
+    def setUp(self):
+        self.ann = make_employee("ann@example.com")
+        self.bob = make_employee("bob@example.com")
+
+    def run_payroll(self, body):
+        return self.client.post("/api/accounts/run_payroll/", json.dumps(body), content_type="application/json")
+
+    def test_non_object_override_is_reported(self):
+        response = self.run_payroll({"month": "March", "year": 2026, "overrides": {
+            "ann@example.com": [5000], "bob@example.com": {"basic_salary": "5000"},
+        }})
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual((result["created"], result["failed"]), (1, 1))
+        self.assertEqual(result["failures"][0]["email"], "ann@example.com")
+
+    def test_rerun_counts_only_its_own_rows(self):
+        body = {"month": "March", "year": 2026, "overrides": {
+            "ann@example.com": {"basic_salary": "5000"}, "bob@example.com": {"basic_salary": "4000"},
+        }}
+        self.assertEqual(self.run_payroll(body).json()["created"], 2)
+        result = self.run_payroll(body).json()
+        self.assertEqual((result["created"], result["skipped"]), (0, 2))
+
+    def test_non_object_body_is_rejected(self):
+        self.assertEqual(self.run_payroll(["March"]).status_code, 400)
+
+    def test_row_inserted_by_another_writer_is_skipped(self):
+        from .models import Payroll
+        from . import payroll_run
+
+        def sneak_in(emails):
+            # a writer that doesn't take the user lock inserts ann's payroll mid-run
+            Payroll.objects.create(email=self.ann, month="March", year=2026, basic_salary=1)
+
+        body = {"month": "March", "year": 2026, "overrides": {
+            "ann@example.com": {"basic_salary": "5000"}, "bob@example.com": {"basic_salary": "4000"},
+        }}
+        with mock.patch.object(payroll_run, "lock_users", sneak_in):
+            result = self.run_payroll(body).json()
+        self.assertEqual((result["created"], result["skipped"]), (1, 1))
+        self.assertEqual(Payroll.objects.get(email=self.ann, month="March").basic_salary, Decimal("1"))
+
+    def test_create_payroll_after_run_is_rejected(self):
+        self.run_payroll({"month": "March", "year": 2026, "overrides": {"ann@example.com": {"basic_salary": "5"}}})
+        response = self.client.post("/api/accounts/create_payroll/", json.dumps(
+            {"email": "ann@example.com", "month": "March", "year": 2026, "basic_salary": "5"}),
+            content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, PAYROLL_RULES=settings.DEFAULT_PAYROLL_RULES)
+class PayrollRulesTests(TestCase):
+    def setUp(self):
+        self.user = make_employee("eve@example.com")
+
+    def create(self, body):
+        return self.client.post("/api/accounts/create_payroll/", json.dumps(body), content_type="application/json")
+
+    def test_computed_fields_are_rejected(self):
+        response = self.create({"email": self.user.email, "month": "March", "year": 2026,
+                                "basic_salary": "50000", "tax": "0"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("tax", response.json()["error"])
+
+    def test_bad_amount_names_the_field(self):
+        response = self.create({"email": self.user.email, "month": "March", "year": 2026, "bonus": "lots"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "bonus must be a number.")
+
+    def test_components_come_from_rules(self):
+        response = self.create({"email": self.user.email, "month": "March", "year": 2026, "basic_salary": "50000"})
+        self.assertEqual(response.status_code, 201)
+        self.assertGreater(Decimal(response.json()["payroll"]["allowances"]), 0)
+
+    @override_settings(PAYROLL_RULES=None)
+    def test_client_components_are_kept_when_rules_are_off(self):
+        response = self.create({"email": self.user.email, "month": "March", "year": 2026,
+                                "basic_salary": "50000", "allowances": "100", "tax": "0"})
+        self.assertEqual(response.status_code, 201)
+        payroll = response.json()["payroll"]
+        self.assertEqual((payroll["allowances"], payroll["tax"], payroll["net_salary"]), ("100.00", "0.00", "50100.00"))
+
+    def test_run_payroll_rejects_computed_overrides(self):
+        response = self.client.post("/api/accounts/run_payroll/", json.dumps({
+            "month": "March", "year": 2026, "overrides": {self.user.email: {"basic_salary": "50000", "tax": "1"}},
+        }), content_type="application/json")
+        self.assertEqual((response.json()["created"], response.json()["failed"]), (0, 1))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TaskCounterTests(TestCase):
+    def setUp(self):
+        self.user = make_employee("fay@example.com")
+        self.task = TaskTable.objects.create(email=self.user, title="Plan", department="Engineering")
+
+    def counts(self):
+        return {status: n for status, n in task_summary("user", self.user.email).items() if n}
+
+    def test_stale_instance_does_not_drift(self):
+        stale = TaskTable.objects.get(pk=self.task.pk)  # loaded while Pending
+        self.task.status = "In Progress"
+        self.task.save()
+        stale.status = "Completed"
+        stale.save()  # moves the task out of In Progress, not out of Pending again
+        self.assertEqual(self.counts(), {"Completed": 1})
+        self.assertEqual(task_summary("department", "Engineering")["Completed"], 1)
+
+    def test_status_change_and_delete(self):
+        self.task.status = "Completed"
+        self.task.save()
+        self.assertEqual(self.counts(), {"Completed": 1})
+        deferred = TaskTable.objects.defer("status").get(pk=self.task.pk)
+        deferred.title = "Plan v2"
+        deferred.save()
+        self.assertEqual(self.counts(), {"Completed": 1})
+        deferred.delete()
+        self.assertEqual(self.counts(), {})
+
+
+@override_settings(CACHES=LOCMEM_CACHE, CALENDAR_MAX_DAYS=366)
+class TeamAvailabilityTests(TestCase):
+    def get(self, date_from, date_to):
+        return self.client.get("/api/accounts/team_availability/",
+                               {"date_from": date_from, "date_to": date_to, "department": "Engineering"})
+
+    def test_range_limit_counts_both_ends(self):
+        self.assertEqual(self.get("2027-01-01", "2028-01-01").status_code, 200)  # 366 days
+        self.assertEqual(self.get("2027-01-01", "2028-01-02").status_code, 400)  # 367 days
+
+    def test_impossible_date_is_rejected(self):
+        self.assertEqual(self.get("2026-02-30", "2026-03-01").status_code, 400)
+
+    def test_leave_days_follow_status_changes(self):
+        user = make_employee("ann@example.com")
+        leave = Leave.objects.create(email=user, department="Engineering", leave_type="Unpaid",
+                                     start_date="2026-03-02", end_date="2026-03-03")
+
+        def on_leave():
+            return {day["date"]: [e["email"] for e in day["on_leave"]]
+                    for day in self.get("2026-03-01", "2026-03-04").json()["days"]}
+
+        def set_status(status):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.patch(f"/api/accounts/update_leave/{leave.id}/",
+                                             json.dumps({"status": status}), content_type="application/json")
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(on_leave()["2026-03-02"], [])  # pending leaves are not on the calendar
+        set_status("Approved")
+        self.assertEqual(on_leave(), {"2026-03-01": [], "2026-03-02": [user.email],
+                                      "2026-03-03": [user.email], "2026-03-04": []})
+        set_status("Cancelled")
+        self.assertEqual(on_leave(), {"2026-03-01": [], "2026-03-02": [], "2026-03-03": [], "2026-03-04": []})
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        self.user = make_employee("gus@example.com")
+        TaskTable.objects.create(email=self.user, title="Plan", description="long text", department="Engineering")
+        Attendance.objects.create(email=self.user, check_in="09:00")
+
+    def test_only_requested_columns_are_selected(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/accounts/list_tasks/", {"fields": "title,status"})
+        self.assertEqual(response.json()["tasks"], [{"title": "Plan", "status": "Pending"}])
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]["sql"]
+        self.assertIn('"title"', sql)
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('"priority"', sql)
+
+    def test_keys_from_related_rows(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/accounts/list_attendance/", {"fields": "role"})
+        self.assertEqual(response.json()["attendance"], [{"role": "Employee"}])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"password"', queries[0]["sql"])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.user = make_employee("hal@example.com")
+        # several rows share created_at, so the pk tiebreaker decides their order
+        self.tasks = [
+            TaskTable.objects.create(email=self.user, title=f"Task {i}", status="Pending" if i % 2 else "Completed")
+            for i in range(7)
+        ]
+        TaskTable.objects.filter(task_id__in=[t.task_id for t in self.tasks[:4]]).update(created_at=self.tasks[0].created_at)
+
+    def pages(self, **params):
+        seen, cursor = [], None
+        while True:
+            query = {"limit": 2, **params, **({"cursor": cursor} if cursor else {})}
+            body = self.client.get("/api/accounts/list_tasks/", query).json()
+            seen.extend(row["task_id"] for row in body["tasks"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                return seen
+
+    def test_pages_cover_every_row_once_in_order(self):
+        expected = list(TaskTable.objects.order_by("-created_at", "-task_id").values_list("task_id", flat=True))
+        self.assertEqual(self.pages(), expected)
+
+    def test_filters_apply_across_pages(self):
+        self.assertEqual(len(self.pages(status="Pending")), 3)
+
+    def test_rows_added_after_the_first_page_do_not_shift_later_pages(self):
+        first = self.client.get("/api/accounts/list_tasks/", {"limit": 3}).json()
+        TaskTable.objects.create(email=self.user, title="Newest")
+        rest = self.client.get("/api/accounts/list_tasks/", {"limit": 10, "cursor": first["next_cursor"]}).json()
+        ids = [row["task_id"] for row in first["tasks"] + rest["tasks"]]
+        self.assertEqual(sorted(ids), sorted(task.task_id for task in self.tasks))
+
+    def test_invalid_cursor_is_rejected(self):
+        for cursor in ["not-base64!", "W10=", "WyJ4IiwgMV0="]:  # garbage, [], ["x", 1]
+            response = self.client.get("/api/accounts/list_tasks/", {"cursor": cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AttendanceAnalyticsTests(TestCase):
+    def test_impossible_date_is_rejected(self):
+        for params in [{"date_from": "2026-02-30"}, {"date_to": "2026-13-01"}]:
+            response = self.client.get("/api/accounts/attendance_analytics/", params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_figures_per_user(self):
+        ann = make_employee("ann@example.com")
+        make_employee("bob@example.com")
+        # Monday..Friday; ann is late on Tuesday and never checks out on Thursday
+        Attendance.objects.create(email=ann, date="2026-03-02", check_in="09:00", check_out="17:00")
+        Attendance.objects.create(email=ann, date="2026-03-03", check_in="09:30", check_out="17:30")
+        Attendance.objects.create(email=ann, date="2026-03-05", check_in="09:00")
+
+        response = self.client.get("/api/accounts/attendance_analytics/", {
+            "date_from": "2026-03-02", "date_to": "2026-03-06", "shift_start": "09:15"})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data["working_days"], data["shift_start"]), (5, "09:15"))
+        rows = {row["user"]: row for row in data["results"]}
+        self.assertEqual(rows["ann@example.com"], {
+            "user": "ann@example.com", "users": 1, "days_present": 3, "late_arrivals": 1,
+            "missing_checkouts": 1, "avg_worked_minutes": 480.0, "total_worked_minutes": 960.0,
+            "absent_days": 2, "longest_absence_streak": 1,
+        })
+        self.assertEqual(rows["bob@example.com"]["days_present"], 0)
+        self.assertEqual(rows["bob@example.com"]["absent_days"], 5)
+        self.assertEqual(rows["bob@example.com"]["longest_absence_streak"], 5)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ExportTests(TestCase):
+    def test_impossible_date_is_rejected(self):
+        response = self.client.get("/api/accounts/export/attendance/", {"date_from": "2026-02-30"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "Dates must be in YYYY-MM-DD format.")
+
+    def test_attendance_csv_and_ndjson(self):
+        ann = make_employee("ann@example.com")
+        Attendance.objects.create(email=ann, date="2026-03-03", check_in="09:00", check_out="17:00")
+        Attendance.objects.create(email=ann, date="2026-03-02", check_in="08:30")
+        Attendance.objects.create(email=ann, date="2026-04-01", check_in="09:00")
+        params = {"date_from": "2026-03-01", "date_to": "2026-03-31"}
+
+        response = self.client.get("/api/accounts/export/attendance/", {**params, "format": "csv"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(b"".join(response.streaming_content).decode().splitlines(), [
+            "email,date,check_in,check_out",
+            "ann@example.com,2026-03-02,08:30:00,",
+            "ann@example.com,2026-03-03,09:00:00,17:00:00",
+        ])
+
+        response = self.client.get("/api/accounts/export/attendance/", {**params, "format": "ndjson"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [
+            {"email": "ann@example.com", "date": "2026-03-02", "check_in": "08:30:00", "check_out": None},
+            {"email": "ann@example.com", "date": "2026-03-03", "check_in": "09:00:00", "check_out": "17:00:00"},
+        ])
+
+    def test_leaves_filtered_by_department(self):
+        ann = make_employee("ann@example.com")
+        bob = make_employee("bob@example.com", department="Sales")
+        Leave.objects.create(email=ann, department="Engineering", leave_type="Unpaid",
+                             start_date="2026-03-02", end_date="2026-03-03")
+        Leave.objects.create(email=bob, department="Sales", leave_type="Unpaid",
+                             start_date="2026-03-02", end_date="2026-03-03")
+        response = self.client.get("/api/accounts/export/leaves/", {"format": "ndjson", "department": "Sales"})
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([(r["email"], r["department"]) for r in rows], [("bob@example.com", "Sales")])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AttendanceBatchTests(TestCase):
+    def setUp(self):
+        self.ann = make_employee("ivy@example.com")
+        self.bob = make_employee("jon@example.com")
+
+    def post(self, events):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/api/accounts/mark_attendance_batch/", json.dumps({"events": events}),
+                                    content_type="application/json")
+
+    def test_check_in_then_out_with_bad_events(self):
+        response = self.post([
+            {"email": self.ann.email}, {"email": ["a"]}, "nope", {"email": "ghost@example.com"},
+            {"email": self.bob.email}, {"email": self.ann.email},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["status"] for r in response.json()["results"]],
+                         ["checked_in", "invalid", "invalid", "not_found", "checked_in", "checked_out"])
+        rows = {a.email_id: a for a in Attendance.objects.filter(date=timezone.localdate())}
+        self.assertEqual(set(rows), {self.ann.email, self.bob.email})
+        self.assertIsNotNone(rows[self.ann.email].check_out)
+        self.assertIsNone(rows[self.bob.email].check_out)
+
+    def test_second_batch_updates_existing_rows(self):
+        self.post([{"email": self.ann.email}])
+        results = self.post([{"email": self.ann.email}, {"email": self.ann.email}]).json()["results"]
+        self.assertEqual([r["status"] for r in results], ["checked_out", "already_checked_out"])
+        self.assertEqual(Attendance.objects.filter(email=self.ann).count(), 1)
+
+    def test_empty_or_non_object_body_is_rejected(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        response = self.client.post("/api/accounts/mark_attendance_batch/", json.dumps([{"email": "x"}]),
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class LeaveOverlapTests(TestCase):
+    def setUp(self):
+        self.user = make_employee("kim@example.com")
+        self.rejected = Leave.objects.create(email=self.user, department="Engineering", leave_type="Unpaid",
+                                             start_date="2026-03-02", end_date="2026-03-04", status="Rejected")
+        self.pending = Leave.objects.create(email=self.user, department="Engineering", leave_type="Unpaid",
+                                            start_date="2026-03-04", end_date="2026-03-05")
+
+    def apply(self, start, end):
+        body = {"email": self.user.email, "leave_type": "Unpaid", "start_date": start, "end_date": end,
+                "department": "Engineering"}
+        return self.client.post("/api/accounts/apply_leave/", json.dumps(body), content_type="application/json")
+
+    def test_apply_overlapping_pending_is_rejected(self):
+        response = self.apply("2026-03-05", "2026-03-06")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], LEAVE_OVERLAP_ERROR)
+        self.assertEqual(self.apply("2026-03-06", "2026-03-06").status_code, 201)
+
+    def test_reapproving_over_a_pending_leave_is_rejected(self):
+        response = self.client.patch(f"/api/accounts/update_leave/{self.rejected.id}/",
+                                     json.dumps({"status": "Approved"}), content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], LEAVE_OVERLAP_ERROR)
+        self.rejected.refresh_from_db()
+        self.assertEqual(self.rejected.status, "Rejected")
+
+    def test_bulk_flags_only_the_conflicting_id(self):
+        other = Leave.objects.create(email=self.user, department="Engineering", leave_type="Unpaid",
+                                     start_date="2026-04-01", end_date="2026-04-01", status="Cancelled")
+        response = self.client.patch("/api/accounts/bulk_update_leave/", json.dumps(
+            {"leave_ids": [self.rejected.id, other.id, self.pending.id], "status": "Approved"}),
+            content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["result"] for r in response.json()["results"]], ["conflict", "updated", "updated"])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class NameIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        make_employee("lena.park@example.com")
+        Employee.objects.filter(email="lena.park@example.com").update(fullname="Lena Park")
+        self.index = NameIndex()
+
+    def test_miss_does_not_query(self):
+        self.assertEqual(self.index.resolve("park"), "lena.park@example.com")
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.index.resolve("unknown"))
+            self.assertEqual(self.index.lookup("le"), ["lena.park@example.com"])
+
+    def test_write_in_another_worker_triggers_rebuild(self):
+        self.index.resolve("park")
+        # what another worker's save does: change the row and bump the shared version
+        Employee.objects.filter(email="lena.park@example.com").update(fullname="Lena Moss")
+        caching._bump(caching.PROFILES_VERSION_KEY)
+        self.assertIsNone(self.index.resolve("park"))
+        self.assertEqual(self.index.resolve("moss"), "lena.park@example.com")
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class LedgerBulkTests(TestCase):
+    def test_bulk_approval_applies_balances_in_one_update(self):
+        users = [make_employee(f"u{i}@example.com") for i in range(3)]
+        leaves = []
+        for user in users:
+            ledger.post_entry(user.email, "Casual", "Adjustment", Decimal("10"))
+            for start, end in [("2026-03-02", "2026-03-03"), ("2026-03-10", "2026-03-10")]:
+                leaves.append(Leave.objects.create(email=user, department="Engineering", leave_type="Casual",
+                                                   start_date=start, end_date=end))
+        old = {leave.id: leave.status for leave in leaves}
+        for leave in leaves:
+            leave.status = "Approved"
+        with CaptureQueriesContext(connection) as queries:
+            ledger.record_status_change(leaves, old)
+        self.assertEqual(sum(q["sql"].startswith("UPDATE") for q in queries), 1)
+        for user in users:
+            self.assertEqual(ledger.get_balance(user.email, "Casual"), Decimal("7"))
+        row = ledger.LeaveBalance.objects.get(email=users[0], leave_type="Casual")
+        self.assertEqual(row.consumed, Decimal("3"))
+
+
+@override_settings(CACHES=LOCMEM_CACHE, TASK_DUE_SOON_DAYS=3)
+class TaskAlertSweepTests(TestCase):
+    def setUp(self):
+        self.user = make_employee("mia@example.com")
+        self.today = datetime.date(2026, 3, 10)
+        self.overdue = TaskTable.objects.create(email=self.user, title="Late", due_date="2026-03-08")
+        self.soon = TaskTable.objects.create(email=self.user, title="Soon", due_date="2026-03-12")
+        TaskTable.objects.create(email=self.user, title="Later", due_date="2026-04-01")
+        TaskTable.objects.create(email=self.user, title="Done", due_date="2026-03-01", status="Completed")
+
+    def test_sweep_counts_only_new_alerts(self):
+        self.assertEqual(sweep_task_alerts(today=self.today), {"created": 2, "removed": 0})
+        self.assertEqual(sweep_task_alerts(today=self.today), {"created": 0, "removed": 0})
+        kinds = dict(TaskAlert.objects.values_list("task_id", "kind"))
+        self.assertEqual(kinds, {self.overdue.task_id: "overdue", self.soon.task_id: "due_soon"})
+
+    def test_completed_task_alert_is_removed(self):
+        sweep_task_alerts(today=self.today)
+        self.soon.status = "Completed"
+        self.soon.save()
+        self.assertEqual(sweep_task_alerts(today=self.today), {"created": 0, "removed": 1})
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ReportSearchTests(TestCase):
+    def setUp(self):
+        self.user = make_employee("ann@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.report = Report.objects.create(email=self.user, title="Quarterly budget",
+                                                content="Spending on cloud hosting went up.")
+
+    def search(self, q):
+        response = self.client.get("/api/accounts/search_reports/", {"q": q})
+        self.assertEqual(response.status_code, 200)
+        return [r["id"] for r in response.json()["reports"]]
+
+    def test_update_and_delete_keep_the_index_in_sync(self):
+        self.assertEqual(self.search("hosting"), [self.report.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(f"/api/accounts/update_report/{self.report.id}/",
+                                       json.dumps({"content": "Travel costs went down."}),
+                                       content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.search("hosting"), [])
+        self.assertEqual(self.search("travel"), [self.report.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/accounts/delete_report/{self.report.id}/")
+        self.assertEqual(self.search("travel"), [])
+
+    def test_query_is_required(self):
+        self.assertEqual(self.client.get("/api/accounts/search_reports/").status_code, 400)
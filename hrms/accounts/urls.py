@@ -5,16 +5,20 @@ from rest_framework_simplejwt.views import (
 )
 from accounts.views import (
     LoginView, CreateSuperUserView, SignupView, approve_user, reject_user,
-    # recognize_face, 
-    today_attendance, RegisterView, list_attendance,
+    recognize_face, recognize_faces,
+    today_attendance, RegisterView, list_attendance, mark_attendance_batch,
+    attendance_summary,
     UserViewSet, EmployeeViewSet, HRViewSet, ManagerViewSet, AdminViewSet, CEOViewSet,
     apply_leave, update_leave_status, leaves_today, list_leaves,
-    create_payroll, update_payroll_status, get_payroll, list_payrolls,
+    create_payroll, update_payroll_status, get_payroll, list_payrolls, run_payroll,
+    payroll_history, payroll_costs, download_payslip,
     list_tasks, get_task, update_task, delete_task, create_task,
-    list_reports, create_report, update_report, delete_report,
+    bulk_create_tasks, bulk_update_tasks, task_summary, task_alerts, sweep_task_alerts_view,
+    list_reports, create_report, update_report, delete_report, search_reports,
     list_projects, create_project, detail_project, update_project, delete_project,
     list_notices, create_notice, detail_notice, update_notice, delete_notice,
-    get_employee_by_email
+    get_employee_by_email, export_records, attendance_analytics,
+    team_availability, leave_balance, adjust_leave_balance, bulk_update_leave_status,
 )
 
 urlpatterns = [
@@ -24,9 +28,13 @@ urlpatterns = [
     path('reject/', reject_user),
     # path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     # path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
-    # path("recognize_face/", recognize_face, name="recognize_face"),
+    path("recognize_face/", recognize_face, name="recognize_face"),
+    path("recognize_faces/", recognize_faces, name="recognize_faces"),
     path("today_attendance/", today_attendance, name="today_attendance"),
     path('list_attendance/', list_attendance, name='attendance-list'),
+    path('mark_attendance_batch/', mark_attendance_batch, name='mark_attendance_batch'),
+    path('attendance_summary/', attendance_summary, name='attendance_summary'),
+    path('attendance_analytics/', attendance_analytics, name='attendance_analytics'),
 
     path('users/', UserViewSet.as_view({'get': 'list', 'post': 'create'}), name='employee-list'),
     path('users/<str:email>/', UserViewSet.as_view({'get': 'retrieve', 'put': 'update', 'delete': 'destroy'}), name='users-detail'),
@@ -48,24 +56,38 @@ urlpatterns = [
 
     path('apply_leave/', apply_leave, name='apply_leave'),
     path('update_leave/<int:leave_id>/', update_leave_status, name='update_leave_status'),
+    path('bulk_update_leave/', bulk_update_leave_status, name='bulk_update_leave_status'),
     path('leaves_today/', leaves_today, name='leaves_today'),
     path('list_leaves/', list_leaves, name='list_leaves'),
+    path('team_availability/', team_availability, name='team_availability'),
+    path('leave_balance/<path:email>/', leave_balance, name='leave_balance'),
+    path('adjust_leave_balance/', adjust_leave_balance, name='adjust_leave_balance'),
 
     path('create_payroll/', create_payroll, name='create_payroll'),
     path('update_payroll/<int:payroll_id>/', update_payroll_status, name='update_payroll_status'),
     path('get_payroll/<path:email>/', get_payroll, name='get_payroll'),
     path('list_payrolls/', list_payrolls, name='list_payrolls'),
+    path('run_payroll/', run_payroll, name='run_payroll'),
+    path('payroll_history/<path:email>/', payroll_history, name='payroll_history'),
+    path('payroll_costs/', payroll_costs, name='payroll_costs'),
+    path('payslip/<int:payroll_id>/', download_payslip, name='download_payslip'),
 
     path('list_tasks/', list_tasks, name='list_tasks'),
     path('get_task/<int:task_id>/', get_task, name='get_task'),
     path('create_task/', create_task, name='create_task'),
     path('update_task/<int:task_id>/', update_task, name='update_task'),
     path('delete_task/<int:task_id>/', delete_task, name='delete_task'),
+    path('bulk_create_tasks/', bulk_create_tasks, name='bulk_create_tasks'),
+    path('bulk_update_tasks/', bulk_update_tasks, name='bulk_update_tasks'),
+    path('task_summary/', task_summary, name='task_summary'),
+    path('task_alerts/', task_alerts, name='task_alerts'),
+    path('sweep_task_alerts/', sweep_task_alerts_view, name='sweep_task_alerts'),
     
     path('list_reports/', list_reports, name='list_reports'),
     path('create_report/', create_report, name='create_report'),
     path('update_report/<int:pk>/', update_report, name='update_report'),
     path('delete_report/<int:pk>/', delete_report, name='delete_report'),
+    path('search_reports/', search_reports, name='search_reports'),
     
     path('list_projects/', list_projects, name='list_projects'),
     path('create_project/', create_project, name='create_project'),
@@ -80,4 +102,6 @@ urlpatterns = [
     path('delete_notice/<int:pk>/', delete_notice, name='delete_notice'),
     
     path('employees/<str:email>/', get_employee_by_email, name='get_employee_by_email'),
+
+    path('export/<str:kind>/', export_records, name='export_records'),
 ]
\ No newline at end of file
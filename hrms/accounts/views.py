@@ -21,7 +21,8 @@ from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_GET, require_POST
-from .models import User, CEO, HR, Manager, Employee, Attendance, Admin, Leave, Payroll, TaskTable, Project, Notice
+from .models import User, CEO, HR, Manager, Employee, Attendance, Admin, Leave, Payroll, TaskTable, Project, Notice, MonthlyAttendance
+from .listing import paginated_list
 from .serializers import UserSerializer, CEOSerializer, HRSerializer, ManagerSerializer, EmployeeSerializer, SuperUserCreateSerializer, UserRegistrationSerializer, AdminSerializer, ReportSerializer
 
 class SignupView(APIView):
@@ -91,40 +92,28 @@ def reject_user(request):
         return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
 
 # =====================
-# Load known faces
+# Known faces
 # =====================
-# KNOWN_FACES_DIR = os.path.join(settings.BASE_DIR, "images")
-# known_face_encodings = []
-# known_face_names = []
-
-# if os.path.exists(KNOWN_FACES_DIR):
-#     for filename in os.listdir(KNOWN_FACES_DIR):
-#         if filename.lower().endswith(('.jpg', '.png')):
-#             image_path = os.path.join(KNOWN_FACES_DIR, filename)
-#             image = face_recognition.load_image_file(image_path)
-#             encodings = face_recognition.face_encodings(image)
-#             if encodings:
-#                 known_face_encodings.append(encodings[0])
-#                 username, _ = os.path.splitext(filename)
-#                 known_face_names.append(username.lower())
-#                 print(f"Loaded known face: {username.lower()}")
-# else:
-#     print(f"[WARNING] Known faces directory {KNOWN_FACES_DIR} not found. Skipping face loading.")
+# Encodings live in accounts.face_engine (one float32 matrix, cached on disk by image mtime)
+# and are loaded once per recognition pool process (accounts.face_worker), not at import time.
+from .face_engine import FaceEngineUnavailable
 
 # =====================
 # Helper: get email by username (partial match)
 # =====================
+from .name_index import name_index, AmbiguousNameError
+
 def get_email_by_username(username):
-    username = username.lower()
-    for model in [HR, Employee, CEO, Manager, Admin]:
-        for obj in model.objects.all():
-            full_name_lower = obj.fullname.lower()
-            if any(part.startswith(username) for part in full_name_lower.split()):
-                email = obj.email.email
-                print(f"[get_email_by_username] Found email {email} for username {username} in {model.fullname}")
-                return email
-    print(f"[get_email_by_username] No email found for username {username}")
-    return None
+    """Resolve a recognized face name to an email via the in-memory name index.
+
+    Raises AmbiguousNameError when the name matches several people equally well.
+    """
+    email = name_index.resolve(username)
+    if email:
+        print(f"[get_email_by_username] Found email {email} for username {username}")
+    else:
+        print(f"[get_email_by_username] No email found for username {username}")
+    return email
 
 # =====================
 # Check if email exists
@@ -184,6 +173,94 @@ def mark_attendance_by_email(email_str):
 
     return attendance
 
+# =====================
+# Mark attendance for many emails at once
+# =====================
+from django.db import transaction
+from django.db.models import Q
+from .rollups import refresh_attendance_rollup
+from .caching import bump_attendance_version
+
+def mark_attendance_bulk(emails):
+    """Check in / check out a batch of emails with one user lookup and one upsert.
+
+    Returns one result dict per input email, in input order. Repeated emails in the
+    same batch behave like consecutive single calls (first checks in, second checks out);
+    missing or non-string emails are reported as "invalid" without affecting the rest.
+    """
+    today = timezone.localdate()
+    now = timezone.now().astimezone(IST).time().replace(microsecond=0)   # force IST
+
+    wanted = {e for e in emails if isinstance(e, str) and e}
+    known = set(User.objects.with_profile().filter(email__in=wanted).values_list('email', flat=True))
+
+    results = []
+    with transaction.atomic():
+        existing = {
+            att.email_id: att
+            for att in Attendance.objects.select_for_update().filter(email__in=known, date=today)
+        }
+        pending = {}
+        for email_str in emails:
+            if not isinstance(email_str, str) or not email_str:
+                results.append({"email": email_str, "status": "invalid", "check_in": "", "check_out": "",
+                                "error": "email must be a non-empty string."})
+                continue
+            if email_str not in known:
+                results.append({"email": email_str, "status": "not_found", "check_in": "", "check_out": ""})
+                continue
+
+            attendance = pending.get(email_str) or existing.get(email_str)
+            if attendance is None:
+                attendance = Attendance(email_id=email_str, date=today, check_in=now)
+                result_status = "checked_in"
+            elif attendance.check_out is None:
+                attendance.check_out = now
+                result_status = "checked_out"
+            else:
+                result_status = "already_checked_out"
+
+            if result_status != "already_checked_out":
+                pending[email_str] = attendance
+            results.append({
+                "email": email_str,
+                "status": result_status,
+                "check_in": str(attendance.check_in) if attendance.check_in else "",
+                "check_out": str(attendance.check_out) if attendance.check_out else "",
+            })
+
+        if pending:
+            Attendance.objects.bulk_create(
+                list(pending.values()),
+                update_conflicts=True,
+                unique_fields=['email', 'date'],
+                update_fields=['check_out'],
+            )
+            # bulk_create skips post_save, so keep the monthly rollup and cache version current here
+            refresh_attendance_rollup({(email, today.year, today.month) for email in pending})
+            bump_attendance_version()
+
+    print(f"[mark_attendance_bulk] Processed {len(emails)} events, wrote {len(pending)} rows for {today}")
+    return results
+
+@csrf_exempt
+@require_POST
+def mark_attendance_batch(request):
+    """Kiosk batch ingestion: {"events": [{"email": ...}, ...]} -> one result per event."""
+    try:
+        data = json.loads(request.body)
+        events = data.get("events") if isinstance(data, dict) else None
+        if not isinstance(events, list) or not events:
+            return JsonResponse({"error": "events must be a non-empty list"}, status=400)
+
+        emails = [event.get("email") if isinstance(event, dict) else None for event in events]
+        results = mark_attendance_bulk(emails)
+        return JsonResponse({"results": results}, status=200)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON."}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
 
 # =====================
 # Render face recognition page
@@ -194,73 +271,151 @@ def mark_attendance_by_email(email_str):
 # =====================
 # Face recognition API
 # =====================
-# @api_view(['POST'])
-# @permission_classes([AllowAny])
-# def recognize_face(request):
-#     try:
-#         data = request.data
-#         image_data = data.get("image", "")
-#         if not image_data:
-#             return JsonResponse({"error": "No image data provided"}, status=400)
-
-#         if "," in image_data:
-#             image_data = image_data.split(",")[1]
-
-#         img_bytes = base64.b64decode(image_data)
-#         img = Image.open(BytesIO(img_bytes)).convert('RGB')
-#         img_np = np.array(img)
-
-#         face_encodings = face_recognition.face_encodings(img_np)
-#         username = "No face detected"
-#         email = None
-#         confidence = 0
-#         attendance = None
-
-#         if face_encodings and known_face_encodings:
-#             face_encoding = face_encodings[0]
-#             distances = face_recognition.face_distance(known_face_encodings, face_encoding)
-#             best_match_index = np.argmin(distances)
-#             best_distance = distances[best_match_index]
-
-#             if best_distance < 0.6:
-#                 username = known_face_names[best_match_index]
-#                 email = get_email_by_username(username)
-#                 confidence = round((1 - best_distance) * 100, 2)
-
-#                 # Directly mark attendance without checking request.user
-#                 attendance = mark_attendance_by_email(email)
-#             else:
-#                 username = "Unknown"
-
-#         return JsonResponse({
-#             "username": username,
-#             "email": email,
-#             "confidence": f"{confidence}%" if email else "",
-#             "check_in": str(attendance.check_in) if attendance else "",
-#             "check_out": str(attendance.check_out) if attendance else ""
-#         })
-
-#     except Exception as e:
-#         return JsonResponse({"error": str(e)}, status=400)
+import time
+from .face_worker import get_recognition_pool, server_timing, RecognitionBusy, RecognitionTimeout
+
+def recognition_busy_response(error):
+    response = JsonResponse({"error": str(error), "retry_after": settings.FACE_RETRY_AFTER}, status=503)
+    response["Retry-After"] = str(settings.FACE_RETRY_AFTER)
+    return response
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def recognize_face(request):
+    try:
+        data = request.data
+        image_data = data.get("image", "")
+        if not image_data:
+            return JsonResponse({"error": "No image data provided"}, status=400)
+
+        # decode / encode / match run in the recognition pool, off this worker
+        result = get_recognition_pool().recognize(image_data)
+        timings = result["timings"]
+        print(f"[recognize_face] timings {timings}")
+
+        username = "No face detected"
+        email = None
+        confidence = 0
+        attendance = None
+
+        if result["matches"]:
+            name, best_distance = result["matches"][0]
+            if name is not None:
+                username = name
+                email = get_email_by_username(username)
+                confidence = round((1 - best_distance) * 100, 2)
+
+                # Directly mark attendance without checking request.user
+                attendance = mark_attendance_by_email(email)
+            else:
+                username = "Unknown"
+
+        response = JsonResponse({
+            "username": username,
+            "email": email,
+            "confidence": f"{confidence}%" if email else "",
+            "check_in": str(attendance.check_in) if attendance else "",
+            "check_out": str(attendance.check_out) if attendance else "",
+            "timings": timings,
+        })
+        response["Server-Timing"] = server_timing(timings)
+        return response
+
+    except RecognitionBusy as e:
+        return recognition_busy_response(e)
+    except RecognitionTimeout as e:
+        return JsonResponse({"error": str(e)}, status=504)
+    except AmbiguousNameError as e:
+        return JsonResponse({"error": str(e), "candidates": e.candidates}, status=409)
+    except FaceEngineUnavailable as e:
+        return JsonResponse({"error": str(e)}, status=503)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+# =====================
+# Multi-frame / multi-face kiosk recognition
+# =====================
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def recognize_faces(request):
+    """{"frames": [base64, ...]} -> every face in every frame, matched in one pass.
+
+    Each recognized person is marked once, in one bulk attendance write.
+    """
+    try:
+        frames = request.data.get("frames")
+        if not isinstance(frames, list) or not frames:
+            return JsonResponse({"error": "frames must be a non-empty list"}, status=400)
+        if len(frames) > settings.FACE_MAX_FRAMES:
+            return JsonResponse({"error": f"At most {settings.FACE_MAX_FRAMES} frames per request"}, status=400)
+
+        result = get_recognition_pool().recognize_many(frames)
+        timings = result["timings"]
+
+        faces_by_frame = []
+        recognized = []
+        for matches in result["frames"]:
+            faces = []
+            for name, distance in matches:
+                face = {"username": name or "Unknown", "email": None, "confidence": ""}
+                if name is not None:
+                    try:
+                        face["email"] = get_email_by_username(name)
+                    except AmbiguousNameError as e:
+                        face["error"] = str(e)
+                        face["candidates"] = e.candidates
+                    face["confidence"] = f"{round((1 - distance) * 100, 2)}%"
+                    if face["email"] and face["email"] not in recognized:
+                        recognized.append(face["email"])
+                faces.append(face)
+            faces_by_frame.append({"faces": faces})
+
+        start = time.perf_counter()
+        attendance = mark_attendance_bulk(recognized) if recognized else []
+        timings["attendance_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        print(f"[recognize_faces] {len(frames)} frames, {len(recognized)} people, timings {timings}")
+
+        response = JsonResponse({"frames": faces_by_frame, "attendance": attendance, "timings": timings})
+        response["Server-Timing"] = server_timing(timings)
+        return response
+
+    except RecognitionBusy as e:
+        return recognition_busy_response(e)
+    except RecognitionTimeout as e:
+        return JsonResponse({"error": str(e)}, status=504)
+    except FaceEngineUnavailable as e:
+        return JsonResponse({"error": str(e)}, status=503)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
 
 # =====================
 # Today attendance view
 # =====================
-def today_attendance(request):
-    today = timezone.localdate()
-    attendances = Attendance.objects.filter(date=today)
+from django.views.decorators.http import condition
+from .caching import cached_snapshot, attendance_etag, attendance_last_modified
 
-    data = [
+def today_attendance_rows(today):
+    return [
         {
-            "email": att.email.email,
-            "date": att.date,
-            "check_in": str(att.check_in) if att.check_in else "",
-            "check_out": str(att.check_out) if att.check_out else ""
+            "email": email,
+            "date": date,
+            "check_in": str(check_in) if check_in else "",
+            "check_out": str(check_out) if check_out else ""
         }
-        for att in attendances
+        for email, date, check_in, check_out in Attendance.objects.filter(date=today)
+        .values_list('email', 'date', 'check_in', 'check_out')
     ]
 
+@condition(
+    etag_func=lambda request: attendance_etag(timezone.localdate()),
+    last_modified_func=lambda request: attendance_last_modified(),
+)
+def today_attendance(request):
+    """Today's snapshot, cached per (date, attendance version); pollers get 304 when unchanged."""
+    today = timezone.localdate()
+    data = cached_snapshot("today_attendance", today, lambda: today_attendance_rows(today))
     return JsonResponse({"attendances": data})
 
 # Helper function to handle PUT
@@ -346,6 +501,25 @@ from django.shortcuts import get_object_or_404
 from django.db.models import Q
 from .models import Leave, User
 
+from . import ledger
+from django.db import connection, IntegrityError
+from django.db.models import F
+
+LEAVE_OVERLAP_ERROR = "You already have a leave request overlapping requested dates."
+# statuses covered by the leave_no_overlap constraint (migration 0008)
+LEAVE_BLOCKING_STATUSES = ["Pending", "Approved"]
+
+def lock_user_for_leave(email):
+    """Serialize leave writes for one user until the surrounding transaction ends.
+
+    PostgreSQL additionally enforces this with the leave_no_overlap exclusion constraint.
+    """
+    if connection.vendor == "sqlite":
+        # No row locks in SQLite: a no-op write takes the database write lock up front.
+        User.objects.filter(email=email).update(role=F('role'))
+    else:
+        list(User.objects.select_for_update().filter(email=email).values_list('email', flat=True))
+
 @csrf_exempt
 def apply_leave(request):
     """Employee applies for leave. If overlapping leave with status Pending or Approved exists, return error."""
@@ -362,26 +536,45 @@ def apply_leave(request):
         if not new_start or not new_end:
             return JsonResponse({"error": "Start date and end date are required."}, status=400)
 
-        # Check for overlapping leaves with status Pending or Approved
-        overlapping_leave_exists = Leave.objects.filter(
-            email=user,
-            status__in=['Pending', 'Approved'],
-        ).filter(
-            Q(start_date__lte=new_end) & Q(end_date__gte=new_start)
-        ).exists()
-
-        if overlapping_leave_exists:
-            return JsonResponse({"error": "You already have a leave request overlapping requested dates."}, status=400)
-
-        leave = Leave.objects.create(
-            email=user,
-            department=data.get("department"),
-            start_date=new_start,
-            end_date=new_end,
-            leave_type=data.get("leave_type", ""),
-            reason=data.get("reason", ""),
-            status="Pending"
-        )
+        leave_type = data.get("leave_type", "")
+        try:
+            with transaction.atomic():
+                lock_user_for_leave(email)
+
+                # Check for overlapping leaves with status Pending or Approved
+                overlapping_leave_exists = Leave.objects.filter(
+                    email=user,
+                    status__in=LEAVE_BLOCKING_STATUSES,
+                ).filter(
+                    Q(start_date__lte=new_end) & Q(end_date__gte=new_start)
+                ).exists()
+
+                if overlapping_leave_exists:
+                    return JsonResponse({"error": LEAVE_OVERLAP_ERROR}, status=400)
+
+                # Tracked leave types must fit in the precomputed balance (minus other pending
+                # requests) once the employee has a ledger; see post_opening_balances
+                if ledger.is_tracked(leave_type) and ledger.has_ledger(email, leave_type):
+                    requested = ledger.leave_length(new_start, new_end)
+                    available = ledger.available_days(email, leave_type)
+                    if requested > available:
+                        return JsonResponse({
+                            "error": f"Insufficient {leave_type} leave balance: requested {requested} days, available {available}."
+                        }, status=400)
+
+                leave = Leave.objects.create(
+                    email=user,
+                    department=data.get("department"),
+                    start_date=new_start,
+                    end_date=new_end,
+                    leave_type=leave_type,
+                    reason=data.get("reason", ""),
+                    status="Pending"
+                )
+        except IntegrityError as e:
+            if "leave_no_overlap" in str(e):
+                return JsonResponse({"error": LEAVE_OVERLAP_ERROR}, status=400)
+            raise
         return JsonResponse({
             "message": "Leave request submitted successfully",
             "leave": {
@@ -408,15 +601,34 @@ def update_leave_status(request, leave_id):
     if request.method != "PATCH":
         return JsonResponse({"error": "Only PATCH method allowed"}, status=405)
     try:
-        leave = get_object_or_404(Leave, id=leave_id)
         data = json.loads(request.body)
         new_status = data.get("status")
 
-        if new_status not in ["Approved", "Rejected"]:
-            return JsonResponse({"error": "Invalid status. Must be Approved or Rejected."}, status=400)
+        if new_status not in ["Approved", "Rejected", "Cancelled"]:
+            return JsonResponse({"error": "Invalid status. Must be Approved, Rejected or Cancelled."}, status=400)
 
-        leave.status = new_status
-        leave.save()
+        try:
+            with transaction.atomic():
+                # lock the row so two concurrent approvals can't both see the old status and debit twice
+                leave = get_object_or_404(Leave.objects.select_for_update(), id=leave_id)
+                if new_status in LEAVE_BLOCKING_STATUSES:
+                    # e.g. re-approving a rejected leave that now overlaps another request
+                    lock_user_for_leave(leave.email_id)
+                    if Leave.objects.filter(
+                        email=leave.email_id,
+                        status__in=LEAVE_BLOCKING_STATUSES,
+                        start_date__lte=leave.end_date,
+                        end_date__gte=leave.start_date,
+                    ).exclude(id=leave.id).exists():
+                        return JsonResponse({"error": LEAVE_OVERLAP_ERROR}, status=400)
+                old_status = leave.status
+                leave.status = new_status
+                leave.save()
+                ledger.record_status_change([leave], {leave.id: old_status})
+        except IntegrityError as e:
+            if "leave_no_overlap" in str(e):
+                return JsonResponse({"error": LEAVE_OVERLAP_ERROR}, status=400)
+            raise
 
         return JsonResponse({
             "message": f"Leave request {new_status}",
@@ -463,25 +675,48 @@ def leaves_today(request):
 
     return JsonResponse({"leaves_today": result}, status=200)
 
+def leave_row(leave):
+    return {
+        "email": leave.email_id,
+        "department": leave.department,
+        "start_date": str(leave.start_date),
+        "end_date": str(leave.end_date),
+        "leave_type": leave.leave_type,
+        "reason": leave.reason,
+        "status": leave.status,
+        "applied_on": str(leave.applied_on)
+    }
+
 @require_GET
 def list_leaves(request):
-    """List all leaves"""
-    leaves = Leave.objects.all().order_by('-applied_on')
+    """List leaves, newest first (?cursor=&limit=&email=&status=&department=&leave_type=&applied_from=&applied_to=
+    &fields=&snippet=)"""
+    return paginated_list(
+        request, Leave.objects.all(), "leaves", leave_row,
+        large_fields=["reason"],
+        filters={
+            "email": "email",
+            "status": "status",
+            "department": "department",
+            "leave_type": "leave_type",
+            "applied_from": "applied_on__gte",
+            "applied_to": "applied_on__lte",
+        },
+    )
 
-    result = []
-    for leave in leaves:
-        result.append({
-            "email": leave.email.email,
-            "department": leave.department,
-            "start_date": str(leave.start_date),
-            "end_date": str(leave.end_date),
-            "leave_type": leave.leave_type,
-            "reason": leave.reason,
-            "status": leave.status,
-            "applied_on": str(leave.applied_on)
-        })
+from decimal import Decimal, InvalidOperation
+from .payroll_rules import get_payroll_rules, supplied_computed_fields
+from .payroll_run import lock_users
 
-    return JsonResponse({"leaves": result}, status=200)
+def salary_amount(data, field):
+    """data[field] (default 0) as a finite Decimal with 2 places; ValueError names the field."""
+    try:
+        amount = Decimal(str(data.get(field) or 0)).quantize(Decimal("0.01"))
+    except (InvalidOperation, TypeError, ValueError):
+        amount = None
+    if amount is None or not amount.is_finite():
+        raise ValueError(f"{field} must be a number.")
+    return amount
 
 @csrf_exempt
 def create_payroll(request):
@@ -491,27 +726,45 @@ def create_payroll(request):
 
     try:
         data = json.loads(request.body)
+        if not isinstance(data, dict):
+            return JsonResponse({"error": "Request body must be a JSON object."}, status=400)
         email = data.get("email")
         user = get_object_or_404(User, email=email)
 
         month = data.get("month")
         year = data.get("year", timezone.now().year)
 
-        # Check if payroll already exists for this month/year
-        if Payroll.objects.filter(email=user, month=month, year=year).exists():
-            return JsonResponse({"error": "Payroll already exists for this month and year"}, status=400)
+        rules = get_payroll_rules()
+        supplied = supplied_computed_fields(data) if rules is not None else []
+        if supplied:
+            return JsonResponse({
+                "error": f"{', '.join(supplied)} are computed from PAYROLL_RULES and cannot be set.",
+            }, status=400)
+        try:
+            amounts = {
+                field: salary_amount(data, field)
+                for field in ["basic_salary", "allowances", "deductions", "bonus", "tax"]
+            }
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
 
-        payroll = Payroll.objects.create(
+        payroll = Payroll(
             email=user,
-            basic_salary=data.get("basic_salary", 0.00),
-            allowances=data.get("allowances", 0.00),
-            deductions=data.get("deductions", 0.00),
-            bonus=data.get("bonus", 0.00),
-            tax=data.get("tax", 0.00),
             month=month,
             year=year,
-            status=data.get("status", "Pending")
+            status=data.get("status", "Pending"),
+            **amounts,
         )
+        if rules is not None:
+            # allowances, deductions and tax are computed server-side from basic + bonus
+            rules.apply([payroll])
+        with transaction.atomic():
+            # same lock as run_payroll, so a concurrent run can't insert this period in between
+            lock_users([user.email])
+            # Check if payroll already exists for this month/year
+            if Payroll.objects.filter(email=user, month=month, year=year).exists():
+                return JsonResponse({"error": "Payroll already exists for this month and year"}, status=400)
+            payroll.save()
 
         return JsonResponse({
             "message": "Payroll created successfully",
@@ -584,7 +837,10 @@ def get_payroll(request, email):
         return JsonResponse({"error": "Only GET method allowed"}, status=405)
 
     user = get_object_or_404(User, email=email)
-    payroll = get_object_or_404(Payroll, email=user)
+    # latest payroll; the full history is at payroll_history/<email>/
+    payroll = Payroll.objects.filter(email=user).order_by('-year', '-pay_date', '-id').first()
+    if payroll is None:
+        return JsonResponse({"error": "No payroll found for this user"}, status=404)
 
     return JsonResponse({
         "payroll": {
@@ -602,28 +858,70 @@ def get_payroll(request, email):
         }
     }, status=200)
 
+def payroll_row(payroll):
+    return {
+        "email": payroll.email_id,
+        "basic_salary": str(payroll.basic_salary),
+        "allowances": str(payroll.allowances),
+        "deductions": str(payroll.deductions),
+        "bonus": str(payroll.bonus),
+        "tax": str(payroll.tax),
+        "net_salary": str(payroll.net_salary),
+        "month": payroll.month,
+        "year": payroll.year,
+        "status": payroll.status,
+        "pay_date": str(payroll.pay_date)
+    }
+
 @require_GET
 def list_payrolls(request):
-    """List all payrolls"""
-    payrolls = Payroll.objects.all().order_by('-pay_date')
+    """List payrolls, newest first (?cursor=&limit=&email=&status=&month=&year=)"""
+    return paginated_list(
+        request, Payroll.objects.all(), "payrolls", payroll_row,
+        filters={"email": "email", "status": "status", "month": "month", "year": "year"},
+    )
 
-    result = []
-    for payroll in payrolls:
-        result.append({
-            "email": payroll.email.email,
-            "basic_salary": str(payroll.basic_salary),
-            "allowances": str(payroll.allowances),
-            "deductions": str(payroll.deductions),
-            "bonus": str(payroll.bonus),
-            "tax": str(payroll.tax),
-            "net_salary": str(payroll.net_salary),
-            "month": payroll.month,
-            "year": payroll.year,
-            "status": payroll.status,
-            "pay_date": str(payroll.pay_date)
-        })
+from decimal import Decimal
+from django.db.models import Count, Sum
+
+PAYROLL_TOTAL_FIELDS = ["basic_salary", "allowances", "deductions", "bonus", "tax", "net_salary"]
+
+def payroll_ytd(queryset, year):
+    """Year-to-date sums for one user's payrolls, aggregated in a single query."""
+    today = timezone.localdate()
+    rows = queryset.filter(year=year)
+    if year == today.year:
+        rows = rows.filter(pay_date__lte=today)
+    totals = rows.aggregate(months=Count('id'), **{field: Sum(field) for field in PAYROLL_TOTAL_FIELDS})
+    return {
+        "year": year,
+        "months": totals.pop("months"),
+        **{field: str((value or Decimal("0")).quantize(Decimal("0.01"))) for field, value in totals.items()},
+    }
+
+@require_GET
+def payroll_history(request, email):
+    """One user's payrolls, newest first (?year=&status=&cursor=&limit=&ytd=1)
 
-    return JsonResponse({"payrolls": result}, status=200)
+    With ytd=1 the response also carries year-to-date totals for ?year (default:
+    current year), honouring the status filter.
+    """
+    if not User.objects.filter(email=email).exists():
+        return JsonResponse({"error": "User not found"}, status=404)
+
+    extra = None
+    if request.GET.get("ytd") in ("1", "true"):
+        try:
+            year = int(request.GET.get("year") or timezone.localdate().year)
+        except ValueError:
+            return JsonResponse({"error": "year must be an integer."}, status=400)
+        extra = lambda queryset: {"ytd": payroll_ytd(queryset, year)}
+
+    return paginated_list(
+        request, Payroll.objects.filter(email=email), "payrolls", payroll_row,
+        filters={"year": "year", "status": "status"},
+        extra=extra,
+    )
 
 from django.http import JsonResponse
 from django.views.decorators.http import require_GET, require_http_methods
@@ -633,29 +931,48 @@ import json
 # ----------------------------
 # List all tasks
 # ----------------------------
+def task_row(task):
+    return {
+        "task_id": task.task_id,
+        "title": task.title,
+        "description": task.description,
+        "email": task.email_id,
+        "assigned_by": task.assigned_by_id,
+        "department": task.department,
+        "priority": task.priority,
+        "status": task.status,
+        "start_date": str(task.start_date),
+        "due_date": str(task.due_date) if task.due_date else None,
+        "completed_date": str(task.completed_date) if task.completed_date else None,
+        "created_at": str(task.created_at),
+        "updated_at": str(task.updated_at),
+    }
+
+OPEN_TASK_STATUSES = ["Pending", "In Progress", "On Hold"]
+
 @require_GET
 def list_tasks(request):
-    tasks = TaskTable.objects.all().order_by('-created_at')
-    result = []
-
-    for task in tasks:
-        result.append({
-            "task_id": task.task_id,
-            "title": task.title,
-            "description": task.description,
-            "email": task.email.email,
-            "assigned_by": task.assigned_by.email if task.assigned_by else None,
-            "department": task.department,
-            "priority": task.priority,
-            "status": task.status,
-            "start_date": str(task.start_date),
-            "due_date": str(task.due_date) if task.due_date else None,
-            "completed_date": str(task.completed_date) if task.completed_date else None,
-            "created_at": str(task.created_at),
-            "updated_at": str(task.updated_at),
-        })
-
-    return JsonResponse({"tasks": result}, status=200)
+    """List tasks, newest first.
+
+    ?cursor=&limit=&email=&assigned_by=&department=&due_from=&due_to=
+    &status=&priority= (comma-separated lists) &open=1 (anything not Completed) &fields=&snippet=
+    """
+    queryset = TaskTable.objects.all()
+    if request.GET.get("open") in ("1", "true"):
+        queryset = queryset.filter(status__in=OPEN_TASK_STATUSES)
+    return paginated_list(
+        request, queryset, "tasks", task_row,
+        large_fields=["description"],
+        filters={
+            "email": "email",
+            "assigned_by": "assigned_by",
+            "status": "status__in",
+            "priority": "priority__in",
+            "department": "department",
+            "due_from": "due_date__gte",
+            "due_to": "due_date__lte",
+        },
+    )
 
 
 # ----------------------------
@@ -665,22 +982,8 @@ def list_tasks(request):
 def get_task(request, task_id):
     try:
         task = TaskTable.objects.get(pk=task_id)
-        data = {
-            "task_id": task.task_id,
-            "title": task.title,
-            "description": task.description,
-            "email": task.email.email,
-            "assigned_by": task.assigned_by.email if task.assigned_by else None,
-            "department": task.department,
-            "priority": task.priority,
-            "status": task.status,
-            "start_date": str(task.start_date),
-            "due_date": str(task.due_date) if task.due_date else None,
-            "completed_date": str(task.completed_date) if task.completed_date else None,
-            "created_at": str(task.created_at),
-            "updated_at": str(task.updated_at),
-        }
-        return JsonResponse(data, status=200)
+        # task_row reads the FK ids off the row itself: no queries for email/assigned_by
+        return JsonResponse(task_row(task), status=200)
     except TaskTable.DoesNotExist:
         return JsonResponse({"error": "Task not found"}, status=404)
 
@@ -809,22 +1112,24 @@ class RegisterView(generics.CreateAPIView):
     serializer_class = RegisterSerializer
 
 
+def attendance_row(record):
+    return {
+        "email": record.email_id,
+        "role": record.email.role,
+        "date": str(record.date),
+        "check_in": str(record.check_in) if record.check_in else None,
+        "check_out": str(record.check_out) if record.check_out else None,
+    }
+
 @require_GET
 def list_attendance(request):
-    """List all attendance records"""
-    attendance_records = Attendance.objects.all().order_by('-date')
-
-    result = []
-    for record in attendance_records:
-        result.append({
-            "email": record.email.email,
-            "role": record.email.role,
-            "date": str(record.date),
-            "check_in": str(record.check_in) if record.check_in else None,
-            "check_out": str(record.check_out) if record.check_out else None,
-        })
-
-    return JsonResponse({"attendance": result}, status=200)
+    """List attendance records, newest first (?cursor=&limit=&email=&role=&date_from=&date_to=)"""
+    return paginated_list(
+        request, Attendance.objects.all(), "attendance", attendance_row,
+        filters={"email": "email", "role": "email__role", "date_from": "date__gte", "date_to": "date__lte"},
+        select_related=["email"],
+        columns={"role": ["email__role"]},
+    )
 
 from django.views.decorators.http import require_GET, require_http_methods
 from django.http import JsonResponse
@@ -840,6 +1145,34 @@ User = get_user_model()
 from django.contrib.auth import get_user_model
 User = get_user_model()
 
+@require_GET
+def attendance_summary(request):
+    """Monthly attendance rollup: ?year=&month= [&email=]. Reads MonthlyAttendance only."""
+    try:
+        year = int(request.GET.get("year", timezone.localdate().year))
+        month = int(request.GET.get("month", timezone.localdate().month))
+    except ValueError:
+        return JsonResponse({"error": "year and month must be integers"}, status=400)
+
+    rows = MonthlyAttendance.objects.filter(year=year, month=month).order_by('email')
+    email = request.GET.get("email")
+    if email:
+        rows = rows.filter(email=email)
+
+    result = [
+        {
+            "email": row.email_id,
+            "year": row.year,
+            "month": row.month,
+            "days_present": row.days_present,
+            "worked_minutes": row.worked_minutes,
+            "late_arrivals": row.late_arrivals,
+            "missing_checkouts": row.missing_checkouts,
+        }
+        for row in rows
+    ]
+    return JsonResponse({"summary": result}, status=200)
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def create_report(request):
@@ -879,21 +1212,25 @@ def create_report(request):
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
 
+def report_row(r):
+    return {
+        "id": r.id,
+        "title": r.title,
+        "description": r.description,
+        "date": str(r.date),
+        "content": r.content,
+        "email": r.email_id,
+        "created_at": r.created_at.isoformat()
+    }
+
 @require_http_methods(["GET"])
 def list_reports(request):
-    reports = Report.objects.all().order_by('-date', '-created_at')
-    result = []
-    for r in reports:
-        result.append({
-            "id": r.id,
-            "title": r.title,
-            "description": r.description,
-            "date": str(r.date),
-            "content": r.content,
-            "email": r.email.email if r.email else None,
-            "created_at": r.created_at.isoformat()
-        })
-    return JsonResponse({"reports": result})
+    """List reports, newest first (?cursor=&limit=&email=&date_from=&date_to=&fields=&snippet=)"""
+    return paginated_list(
+        request, Report.objects.all(), "reports", report_row,
+        large_fields=["description", "content"],
+        filters={"email": "email", "date_from": "date__gte", "date_to": "date__lte"},
+    )
 
 
 
@@ -920,7 +1257,7 @@ def update_report(request, pk):
             "description": report.description,
             "content": report.content,
             "date": str(report.date),
-            "created_by": report.created_by.email if report.created_by else None,
+            "created_by": report.email_id,
             "created_at": str(report.created_at)
         }, status=200)
     except Exception as e:
@@ -937,11 +1274,17 @@ def delete_report(request, pk):
     report.delete()
     return JsonResponse({"message": "Report deleted successfully."}, status=204)
 
+def project_row(p):
+    return {"id": p.id, "name": p.name, "description": p.description, "status": p.status}
+
 @require_http_methods(["GET"])
 def list_projects(request):
-    projects = Project.objects.all().order_by('-created_at')
-    result = [{"id": p.id, "name": p.name, "description": p.description, "status": p.status} for p in projects]
-    return JsonResponse({"projects": result})
+    """List projects, newest first (?cursor=&limit=&email=&status=&fields=&snippet=)"""
+    return paginated_list(
+        request, Project.objects.all(), "projects", project_row,
+        large_fields=["description"],
+        filters={"email": "email", "status": "status"},
+    )
 
 
 @csrf_exempt
@@ -1038,22 +1381,26 @@ def delete_project(request, pk):
     except Project.DoesNotExist:
         return JsonResponse({"error": "Project not found"}, status=404)
     
+def notice_row(notice):
+    return {
+        "id": notice.id,
+        "title": notice.title,
+        "message": notice.message,
+        "email": notice.email_id,
+        "posted_date": notice.posted_date.isoformat(),
+        "valid_until": notice.valid_until.isoformat() if notice.valid_until else None,
+        "important": notice.important,
+        "attachment": notice.attachment.url if notice.attachment else None,
+    }
+
 @require_http_methods(["GET"])
 def list_notices(request):
-    notices = Notice.objects.all().order_by('-posted_date')
-    result = []
-    for notice in notices:
-        result.append({
-            "id": notice.id,
-            "title": notice.title,
-            "message": notice.message,
-            "email": notice.email.email if notice.email else None,
-            "posted_date": notice.posted_date.isoformat(),
-            "valid_until": notice.valid_until.isoformat() if notice.valid_until else None,
-            "important": notice.important,
-            "attachment": notice.attachment.url if notice.attachment else None,
-        })
-    return JsonResponse({"notices": result})
+    """List notices, newest first (?cursor=&limit=&email=&important=&fields=&snippet=)"""
+    return paginated_list(
+        request, Notice.objects.all(), "notices", notice_row,
+        large_fields=["message"],
+        filters={"email": "email", "important": "important"},
+    )
 
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
@@ -1138,4 +1485,836 @@ def get_employee_by_email(request, email):
             "profile_picture": employee.profile_picture.url if employee.profile_picture else "",
         })
     except Employee.DoesNotExist:
-        return JsonResponse({"error": "Employee not found"}, status=404)
\ No newline at end of file
+        return JsonResponse({"error": "Employee not found"}, status=404)
+# ----------------------------
+# Streaming exports (CSV / NDJSON)
+# ----------------------------
+import csv
+import datetime
+from django.http import StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date
+
+def department_q(department, user_path="email"):
+    """Match rows whose user belongs to `department` in any profile table that has one."""
+    return (
+        Q(**{f"{user_path}__employee__department": department})
+        | Q(**{f"{user_path}__hr__department": department})
+        | Q(**{f"{user_path}__manager__department": department})
+    )
+
+EXPORTS = {
+    "attendance": {
+        "queryset": lambda: Attendance.objects.all(),
+        "columns": ["email", "date", "check_in", "check_out"],
+        "order_by": ["date", "email"],
+        "date_range": lambda start, end: Q(date__gte=start) & Q(date__lte=end),
+    },
+    "leaves": {
+        "queryset": lambda: Leave.objects.all(),
+        "columns": ["id", "email", "department", "start_date", "end_date", "leave_type", "reason", "status", "applied_on"],
+        "order_by": ["start_date", "id"],
+        "date_range": lambda start, end: Q(start_date__lte=end) & Q(end_date__gte=start),
+        "department_field": "department",
+    },
+    "payroll": {
+        "queryset": lambda: Payroll.objects.all(),
+        "columns": ["id", "email", "month", "year", "basic_salary", "allowances", "deductions",
+                    "bonus", "tax", "net_salary", "status", "pay_date"],
+        "order_by": ["pay_date", "id"],
+        "date_range": lambda start, end: Q(pay_date__gte=start) & Q(pay_date__lte=end),
+    },
+}
+
+class Echo:
+    """File-like object whose write() just hands the line back to csv.writer's caller."""
+    def write(self, value):
+        return value
+
+def stream_csv(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+def stream_ndjson(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + "\n"
+
+@require_GET
+def export_records(request, kind):
+    """Stream attendance / leaves / payroll as ?format=csv|ndjson with &date_from=&date_to=&department="""
+    spec = EXPORTS.get(kind)
+    if spec is None:
+        return JsonResponse({"error": f"Unknown export '{kind}'. Use one of: {', '.join(EXPORTS)}"}, status=404)
+
+    fmt = request.GET.get("format", "csv")
+    if fmt not in ("csv", "ndjson"):
+        return JsonResponse({"error": "format must be csv or ndjson"}, status=400)
+
+    queryset = spec["queryset"]()
+    date_from, date_to = request.GET.get("date_from"), request.GET.get("date_to")
+    if date_from or date_to:
+        try:
+            start = parse_date(date_from) if date_from else datetime.date.min
+            end = parse_date(date_to) if date_to else datetime.date.max
+        except ValueError:  # well formed but not a real date, e.g. 2026-02-30
+            start = end = None
+        if not start or not end:
+            return JsonResponse({"error": "Dates must be in YYYY-MM-DD format."}, status=400)
+        queryset = queryset.filter(spec["date_range"](start, end))
+
+    department = request.GET.get("department")
+    if department:
+        if "department_field" in spec:
+            queryset = queryset.filter(**{spec["department_field"]: department})
+        else:
+            queryset = queryset.filter(department_q(department))
+
+    columns = spec["columns"]
+    rows = queryset.order_by(*spec["order_by"]).values_list(*columns) \
+        .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+    if fmt == "csv":
+        response = StreamingHttpResponse(stream_csv(columns, rows), content_type="text/csv")
+    else:
+        response = StreamingHttpResponse(stream_ndjson(columns, rows), content_type="application/x-ndjson")
+    response["Content-Disposition"] = f'attachment; filename="{kind}.{fmt}"'
+    return response
+
+# ----------------------------
+# Attendance analytics (aggregated in SQL)
+# ----------------------------
+from django.db.models import Avg, Count, DateField, DurationField, ExpressionWrapper, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from .rollups import shift_start as default_shift_start
+
+ANALYTICS_GROUPS = {
+    # group_by: (key on Attendance rows, key on User rows)
+    "user": (F("email"), F("email")),
+    "role": (F("email__role"), F("role")),
+    "department": (
+        Coalesce("email__employee__department", "email__hr__department", "email__manager__department"),
+        Coalesce("employee__department", "hr__department", "manager__department"),
+    ),
+}
+WORKING_WEEK_DAYS = [2, 3, 4, 5, 6]  # Monday..Friday in Django's __week_day numbering
+
+def working_days(start, end):
+    days = (end - start).days + 1
+    weeks, rest = divmod(days, 7)
+    return weeks * 5 + sum(1 for i in range(rest) if (start.weekday() + i) % 7 < 5)
+
+@require_GET
+def attendance_analytics(request):
+    """Lateness, hours and absences for ?date_from=&date_to=&group_by=user|department|role&shift_start=HH:MM
+
+    Everything is aggregated by the database; only one summary row per group comes back.
+    absent_days counts Mon-Fri days without attendance; longest_absence_streak is the
+    longest run of calendar days without attendance inside the range.
+    """
+    today = timezone.localdate()
+    try:
+        start = parse_date(request.GET.get("date_from", "")) or today.replace(day=1)
+        end = parse_date(request.GET.get("date_to", "")) or today
+    except ValueError:  # well formed but not a real date, e.g. 2026-02-30
+        return JsonResponse({"error": "date_from and date_to must be valid YYYY-MM-DD dates."}, status=400)
+    if start > end:
+        return JsonResponse({"error": "date_from must not be after date_to"}, status=400)
+
+    group_by = request.GET.get("group_by", "user")
+    if group_by not in ANALYTICS_GROUPS:
+        return JsonResponse({"error": f"group_by must be one of: {', '.join(ANALYTICS_GROUPS)}"}, status=400)
+    attendance_key, user_key = ANALYTICS_GROUPS[group_by]
+
+    try:
+        late_after = datetime.time.fromisoformat(request.GET["shift_start"]) \
+            if request.GET.get("shift_start") else default_shift_start()
+    except ValueError:
+        return JsonResponse({"error": "shift_start must be HH:MM"}, status=400)
+
+    next_seen = Attendance.objects.filter(email=OuterRef('email'), date__gt=OuterRef('date'), date__lte=end) \
+        .order_by('date').values('date')[:1]
+    prev_seen = Attendance.objects.filter(email=OuterRef('email'), date__lt=OuterRef('date'), date__gte=start) \
+        .order_by('-date').values('date')[:1]
+    day = datetime.timedelta(days=1)
+
+    stats = (
+        Attendance.objects.filter(date__range=(start, end), check_in__isnull=False)
+        .annotate(
+            group=attendance_key,
+            gap_before=ExpressionWrapper(
+                F('date') - Coalesce(Subquery(prev_seen), Value(start - day), output_field=DateField()),
+                output_field=DurationField()),
+            gap_after=ExpressionWrapper(
+                Coalesce(Subquery(next_seen), Value(end + day), output_field=DateField()) - F('date'),
+                output_field=DurationField()),
+            worked=ExpressionWrapper(F('check_out') - F('check_in'), output_field=DurationField()),
+        )
+        .values('group')
+        .annotate(
+            users_present=Count('email', distinct=True),
+            days_present=Count('id'),
+            weekdays_present=Count('id', filter=Q(date__week_day__in=WORKING_WEEK_DAYS)),
+            late_arrivals=Count('id', filter=Q(check_in__gt=late_after)),
+            missing_checkouts=Count('id', filter=Q(check_out__isnull=True)),
+            avg_worked=Avg('worked', filter=Q(check_out__isnull=False)),
+            total_worked=Sum('worked', filter=Q(check_out__isnull=False)),
+            longest_gap=Max(Greatest('gap_before', 'gap_after')),
+        )
+        .order_by('group')
+    )
+
+    # Head count per group, so people with no attendance at all still show up as absent.
+    headcount = dict(
+        User.objects.with_profile().filter(is_active=True)
+        .annotate(group=user_key)
+        .values('group').annotate(n=Count('email')).values_list('group', 'n')
+    )
+
+    expected = working_days(start, end)
+    span = (end - start).days + 1
+    minutes = lambda delta: round(delta.total_seconds() / 60, 1) if delta is not None else None
+
+    result = []
+    for row in stats:
+        users = max(headcount.pop(row['group'], 0), row['users_present'])
+        result.append({
+            group_by: row['group'],
+            "users": users,
+            "days_present": row['days_present'],
+            "late_arrivals": row['late_arrivals'],
+            "missing_checkouts": row['missing_checkouts'],
+            "avg_worked_minutes": minutes(row['avg_worked']),
+            "total_worked_minutes": minutes(row['total_worked']),
+            "absent_days": max(users * expected - row['weekdays_present'], 0),
+            "longest_absence_streak": (row['longest_gap'].days - 1) if users == row['users_present'] else span,
+        })
+    for group, users in headcount.items():   # groups where nobody checked in
+        result.append({
+            group_by: group, "users": users, "days_present": 0, "late_arrivals": 0,
+            "missing_checkouts": 0, "avg_worked_minutes": None, "total_worked_minutes": None,
+            "absent_days": users * expected, "longest_absence_streak": span,
+        })
+
+    return JsonResponse({
+        "date_from": str(start),
+        "date_to": str(end),
+        "shift_start": late_after.strftime("%H:%M"),
+        "working_days": expected,
+        "results": result,
+    }, status=200)
+
+# ----------------------------
+# Team availability calendar
+# ----------------------------
+from .models import LeaveDay
+
+@require_GET
+def team_availability(request):
+    """Who is on approved leave each day: ?date_from=&date_to= and ?department= or ?manager=<email>"""
+    try:
+        start = parse_date(request.GET.get("date_from", ""))
+        end = parse_date(request.GET.get("date_to", ""))
+    except ValueError:  # well formed but not a real date, e.g. 2026-02-30
+        start = end = None
+    if not start or not end:
+        return JsonResponse({"error": "date_from and date_to (YYYY-MM-DD) are required."}, status=400)
+    # the range is inclusive: date_from..date_to covers (end - start).days + 1 days
+    if start > end or (end - start).days + 1 > settings.CALENDAR_MAX_DAYS:
+        return JsonResponse({"error": f"Date range must be ascending and at most {settings.CALENDAR_MAX_DAYS} days."}, status=400)
+
+    days = LeaveDay.objects.filter(date__range=(start, end))
+    department = request.GET.get("department")
+    manager = request.GET.get("manager")
+    if department:
+        days = days.filter(department=department)
+    elif manager:
+        days = days.filter(email__in=Employee.objects.filter(reports_to=manager).values('email'))
+    else:
+        return JsonResponse({"error": "department or manager is required."}, status=400)
+
+    calendar = {}
+    for date, email, leave_type in days.order_by('date', 'email').values_list('date', 'email', 'leave_type'):
+        calendar.setdefault(date, []).append({"email": email, "leave_type": leave_type})
+
+    result = []
+    current = start
+    while current <= end:
+        result.append({"date": str(current), "on_leave": calendar.get(current, [])})
+        current += datetime.timedelta(days=1)
+    return JsonResponse({"days": result}, status=200)
+
+# ----------------------------
+# Leave balances (ledger)
+# ----------------------------
+from .models import LeaveBalance
+from decimal import Decimal, InvalidOperation
+
+@require_GET
+def leave_balance(request, email):
+    """Precomputed balance per leave type for one user (?leave_type= narrows to one row)."""
+    balances = LeaveBalance.objects.filter(email=email)
+    if request.GET.get("leave_type"):
+        balances = balances.filter(leave_type=request.GET["leave_type"])
+    result = [
+        {
+            "leave_type": b.leave_type,
+            "accrued": str(b.accrued),
+            "consumed": str(b.consumed),
+            "adjusted": str(b.adjusted),
+            "balance": str(b.balance),
+        }
+        for b in balances
+    ]
+    return JsonResponse({"email": email, "balances": result}, status=200)
+
+@csrf_exempt
+@require_POST
+def adjust_leave_balance(request):
+    """HR correction: {"email", "leave_type", "days" (+/-), "note"}"""
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            return JsonResponse({"error": "Request body must be a JSON object."}, status=400)
+        email = data.get("email")
+        leave_type = data.get("leave_type")
+        if not isinstance(email, str) or not isinstance(leave_type, str) or not email or not leave_type \
+                or data.get("days") is None:
+            return JsonResponse({"error": "email, leave_type and days are required."}, status=400)
+        try:
+            days = Decimal(str(data["days"]))
+        except InvalidOperation:
+            return JsonResponse({"error": "days must be a number."}, status=400)
+        # NaN/Infinity parse as Decimals but cannot be stored in the balance columns
+        if not days.is_finite() or days != days.quantize(Decimal("0.01")) or abs(days) >= 10000:
+            return JsonResponse({"error": "days must be a finite number with at most 2 decimals."}, status=400)
+        if not User.objects.filter(email=email).exists():
+            return JsonResponse({"error": "User not found"}, status=404)
+
+        ledger.post_entry(email, leave_type, "Adjustment", days, note=data.get("note"))
+        return JsonResponse({
+            "message": "Leave balance adjusted",
+            "email": email,
+            "leave_type": leave_type,
+            "balance": str(ledger.get_balance(email, leave_type)),
+        }, status=200)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON."}, status=400)
+
+# ----------------------------
+# Bulk leave status update
+# ----------------------------
+from django.db.models import Exists
+from .rollups import sync_leave_days
+from .payroll_run import lock_users
+
+def is_leave_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+@csrf_exempt
+@require_http_methods(["PATCH"])
+def bulk_update_leave_status(request):
+    """{"leave_ids": [...], "status": "Approved" | "Rejected" | "Cancelled"} -> one result per id.
+
+    Conflicts with other pending or approved leaves (what leave_no_overlap covers) are
+    found in the same query that loads the batch; the valid leaves are then switched
+    with a single UPDATE.
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON."}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({"error": "Request body must be a JSON object."}, status=400)
+
+    leave_ids = data.get("leave_ids")
+    new_status = data.get("status")
+    if not isinstance(leave_ids, list) or not leave_ids:
+        return JsonResponse({"error": "leave_ids must be a non-empty list"}, status=400)
+    if new_status not in ["Approved", "Rejected", "Cancelled"]:
+        return JsonResponse({"error": "Invalid status. Must be Approved, Rejected or Cancelled."}, status=400)
+
+    blocking_overlap = Leave.objects.filter(
+        status__in=LEAVE_BLOCKING_STATUSES,
+        email=OuterRef('email'),
+        start_date__lte=OuterRef('end_date'),
+        end_date__gte=OuterRef('start_date'),
+    ).exclude(id=OuterRef('id'))
+
+    ids = [i for i in leave_ids if is_leave_id(i)]
+    try:
+        with transaction.atomic():
+            # serialize with apply_leave for these users before looking for overlaps
+            lock_users(sorted(set(Leave.objects.filter(id__in=ids).values_list('email', flat=True))))
+            leaves = {
+                leave.id: leave
+                for leave in Leave.objects.select_for_update()
+                .filter(id__in=ids)
+                .annotate(overlaps_blocking=Exists(blocking_overlap))
+            }
+
+            results, valid, accepted_ranges, seen = [], [], {}, set()
+            for leave_id in leave_ids:
+                if not is_leave_id(leave_id):
+                    results.append({"id": leave_id, "result": "invalid", "error": "Leave ids must be integers."})
+                    continue
+                if leave_id in seen:
+                    # a repeated id must not be switched (or posted to the ledger) twice
+                    results.append({"id": leave_id, "result": "duplicate"})
+                    continue
+                seen.add(leave_id)
+                leave = leaves.get(leave_id)
+                if leave is None:
+                    results.append({"id": leave_id, "result": "not_found"})
+                    continue
+                if leave.status == new_status:
+                    results.append({"id": leave_id, "result": "unchanged", "status": leave.status})
+                    continue
+                if new_status in LEAVE_BLOCKING_STATUSES:
+                    # also reject overlaps between leaves approved in this same batch
+                    same_batch = any(
+                        start <= leave.end_date and end >= leave.start_date
+                        for start, end in accepted_ranges.get(leave.email_id, [])
+                    )
+                    if leave.overlaps_blocking or same_batch:
+                        results.append({"id": leave_id, "result": "conflict",
+                                        "error": "Overlaps a pending or approved leave for this user."})
+                        continue
+                    accepted_ranges.setdefault(leave.email_id, []).append((leave.start_date, leave.end_date))
+                valid.append(leave)
+                results.append({"id": leave_id, "result": "updated", "status": new_status})
+
+            if valid:
+                old_statuses = {leave.id: leave.status for leave in valid}
+                Leave.objects.filter(id__in=list(old_statuses)).update(status=new_status)
+                for leave in valid:
+                    leave.status = new_status
+                # .update() skips post_save: keep the calendar index and the ledger in step here
+                sync_leave_days(valid)
+                ledger.record_status_change(valid, old_statuses)
+    except IntegrityError as e:
+        if "leave_no_overlap" in str(e):
+            # e.g. re-approving a rejected leave that now overlaps a pending one
+            return JsonResponse({"error": LEAVE_OVERLAP_ERROR + " No leaves were updated."}, status=400)
+        raise
+
+    return JsonResponse({"updated": len(valid), "results": results}, status=200)
+
+# ----------------------------
+# Monthly payroll run
+# ----------------------------
+from .payroll_run import run_payroll as run_payroll_batch
+
+@csrf_exempt
+@require_POST
+def run_payroll(request):
+    """{"month", "year", "pay_date"?, "status"?, "emails"?, "overrides"?: {email: {basic_salary, ...}}}
+
+    Generates payroll for every active user in one transaction; see payroll_run.run_payroll.
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON."}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({"error": "Request body must be a JSON object."}, status=400)
+
+    month = data.get("month")
+    if not month:
+        return JsonResponse({"error": "month is required."}, status=400)
+    try:
+        year = int(data.get("year", timezone.now().year))
+    except (TypeError, ValueError):
+        return JsonResponse({"error": "year must be an integer."}, status=400)
+    status = data.get("status", "Pending")
+    if status not in ["Pending", "Paid", "Failed"]:
+        return JsonResponse({"error": "Invalid status"}, status=400)
+    pay_date = None
+    if data.get("pay_date"):
+        try:
+            pay_date = parse_date(str(data["pay_date"]))
+        except ValueError:
+            pay_date = None
+        if pay_date is None:
+            return JsonResponse({"error": "pay_date must be YYYY-MM-DD."}, status=400)
+    overrides = data.get("overrides") or {}
+    emails = data.get("emails")
+    if not isinstance(overrides, dict) or (emails is not None and not isinstance(emails, list)):
+        return JsonResponse({"error": "overrides must be an object and emails a list."}, status=400)
+
+    result = run_payroll_batch(str(month), year, pay_date=pay_date, overrides=overrides, status=status, emails=emails)
+    print(f"[run_payroll] {month} {year}: created={result['created']} skipped={result['skipped']} failed={result['failed']}")
+    return JsonResponse(result, status=200)
+
+# ----------------------------
+# Payroll cost aggregates
+# ----------------------------
+from django.core.cache import cache
+from .caching import payroll_totals_key, SNAPSHOT_TIMEOUT
+
+PAYROLL_COST_FIELDS = ["basic_salary", "allowances", "deductions", "bonus", "tax", "net_salary"]
+
+def payroll_month_totals(year, months):
+    """{month: [{department, status, payrolls, <sums>}]} in one GROUP BY over the given months."""
+    rows = Payroll.objects.filter(year=year, month__in=months) \
+        .annotate(department=ANALYTICS_GROUPS["department"][0]) \
+        .values('month', 'department', 'status') \
+        .annotate(payrolls=Count('id'), **{field + "_total": Sum(field) for field in PAYROLL_COST_FIELDS}) \
+        .order_by('month', 'department', 'status')
+    totals = {month: [] for month in months}
+    for row in rows:
+        totals[row.pop('month')].append({
+            "department": row["department"],
+            "status": row["status"],
+            "payrolls": row["payrolls"],
+            **{field: str((row[field + "_total"] or Decimal("0")).quantize(Decimal("0.01"))) for field in PAYROLL_COST_FIELDS},
+        })
+    return totals
+
+@require_GET
+def payroll_costs(request):
+    """Payroll totals per month, department and status (?year=&month=&department=&status=)
+
+    Each month is cached until a Payroll row of that month (or a profile's
+    department) changes; only months missing from the cache are aggregated.
+    """
+    try:
+        year = int(request.GET.get("year") or timezone.localdate().year)
+    except ValueError:
+        return JsonResponse({"error": "year must be an integer."}, status=400)
+
+    month = request.GET.get("month", "").strip()
+    if len(month) > Payroll._meta.get_field("month").max_length:
+        return JsonResponse({"error": "month is too long."}, status=400)
+    if month:
+        months = [month]
+    else:
+        # served by the (year, month) index
+        months = list(Payroll.objects.filter(year=year).order_by().values_list('month', flat=True).distinct())
+
+    keys = {month: payroll_totals_key(year, month) for month in months}
+    cached = cache.get_many(list(keys.values()))
+    totals = {month: cached[key] for month, key in keys.items() if key in cached}
+    missing = [month for month in months if month not in totals]
+    if missing:
+        fresh = payroll_month_totals(year, missing)
+        cache.set_many({keys[month]: rows for month, rows in fresh.items()}, SNAPSHOT_TIMEOUT)
+        totals.update(fresh)
+
+    department = request.GET.get("department")
+    status = request.GET.get("status")
+    return JsonResponse({
+        "year": year,
+        "months": [
+            {
+                "month": month,
+                "groups": [
+                    row for row in totals[month]
+                    if (not department or row["department"] == department) and (not status or row["status"] == status)
+                ],
+            }
+            for month in months
+        ],
+    }, status=200)
+
+# ----------------------------
+# Payslip download
+# ----------------------------
+from django.http import FileResponse
+from .payslips import with_fullname, payslip_data, get_payslip_renderer
+
+@require_GET
+def download_payslip(request, payroll_id):
+    """PDF payslip for one payroll, served from the file cache.
+
+    A slip that isn't rendered yet (or whose payroll changed) is queued on the
+    payslip pool and the client gets 202 + Retry-After instead of waiting; if
+    rendering failed the poll gets 500 with the error (?retry=1 tries again).
+    """
+    payroll = with_fullname(Payroll.objects.filter(id=payroll_id)).first()
+    if payroll is None:
+        return JsonResponse({"error": "Payroll not found"}, status=404)
+
+    renderer = get_payslip_renderer()
+    path, future = renderer.submit(payslip_data(payroll), retry=request.GET.get("retry") == "1")
+    error = renderer.failure(path)
+    if error is not None:
+        return JsonResponse({"error": f"Payslip could not be rendered: {error}"}, status=500)
+    if future is None:
+        try:
+            return FileResponse(
+                open(path, "rb"), as_attachment=True, content_type="application/pdf",
+                filename=f"payslip_{payroll.email_id}_{payroll.month}_{payroll.year}.pdf",
+            )
+        except FileNotFoundError:
+            pass  # replaced by a newer version between the check and the open
+
+    response = JsonResponse({"status": "rendering", "retry_after": settings.PAYSLIP_RETRY_AFTER}, status=202)
+    response["Retry-After"] = str(settings.PAYSLIP_RETRY_AFTER)
+    return response
+
+# ----------------------------
+# Bulk task create / update
+# ----------------------------
+from .task_counters import counter_state, record_task_changes
+
+TASK_TEXT_FIELDS = ["title", "description", "department"]
+TASK_CHOICE_FIELDS = ["priority", "status"]
+TASK_DATE_FIELDS = ["start_date", "due_date", "completed_date"]
+TASK_USER_FIELDS = ["email", "assigned_by"]
+
+def task_items(request):
+    """Parse {"tasks": [...]} -> (items, error response or None)."""
+    try:
+        items = json.loads(request.body).get("tasks")
+    except (json.JSONDecodeError, AttributeError):
+        return None, JsonResponse({"error": "Invalid JSON."}, status=400)
+    if not isinstance(items, list) or not items:
+        return None, JsonResponse({"error": "tasks must be a non-empty list"}, status=400)
+    if len(items) > settings.TASK_BULK_LIMIT:
+        return None, JsonResponse({"error": f"At most {settings.TASK_BULK_LIMIT} tasks per request."}, status=400)
+    return items, None
+
+def referenced_users(items):
+    """Every email/assigned_by mentioned in the batch that exists, in one query."""
+    emails = {
+        item[field] for item in items if isinstance(item, dict)
+        for field in TASK_USER_FIELDS if isinstance(item.get(field), str)
+    }
+    return set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+
+def clean_task_fields(item, users):
+    """Validate the task fields present in `item` -> ({attname: value}, {field: error})."""
+    values, errors = {}, {}
+    for field in TASK_TEXT_FIELDS:
+        if field in item:
+            max_length = TaskTable._meta.get_field(field).max_length
+            if item[field] is not None and not isinstance(item[field], str):
+                errors[field] = "Must be a string."
+            elif max_length and item[field] and len(item[field]) > max_length:
+                errors[field] = f"At most {max_length} characters."
+            else:
+                values[field] = item[field]
+    for field in TASK_CHOICE_FIELDS:
+        if field in item:
+            choices = [value for value, _ in TaskTable._meta.get_field(field).choices]
+            if item[field] not in choices:
+                errors[field] = f"Must be one of {', '.join(choices)}."
+            else:
+                values[field] = item[field]
+    for field in TASK_DATE_FIELDS:
+        if field in item:
+            value = item[field]
+            try:
+                date = parse_date(value) if value else None
+            except (TypeError, ValueError):
+                date = False
+            if value and not date:
+                errors[field] = "Must be a valid YYYY-MM-DD date."
+            elif field == "start_date" and date is None:
+                errors[field] = "start_date cannot be empty."
+            else:
+                values[field] = date
+    for field in TASK_USER_FIELDS:
+        if field in item:
+            value = item[field]
+            if field == "assigned_by" and value in (None, ""):
+                values["assigned_by_id"] = None
+            elif not isinstance(value, str):
+                errors[field] = "Must be an email string."
+            elif value not in users:
+                errors[field] = "User not found."
+            else:
+                values[f"{field}_id"] = value
+    if "title" in values and not values["title"]:
+        errors["title"] = "title cannot be empty."
+    return values, errors
+
+@csrf_exempt
+@require_POST
+def bulk_create_tasks(request):
+    """{"tasks": [{email, title, ...create_task fields}, ...]} -> one result per item.
+
+    Invalid items are reported and skipped; the rest are inserted with one bulk_create.
+    """
+    items, error = task_items(request)
+    if error:
+        return error
+
+    users = referenced_users(items)
+    results, tasks = [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append({"index": index, "result": "error", "errors": {"task": "Must be an object."}})
+            continue
+        values, errors = clean_task_fields(item, users)
+        for field in ["email", "title"]:
+            if not item.get(field):
+                errors[field] = f"{field} is required."
+        if errors:
+            results.append({"index": index, "result": "error", "errors": errors})
+            continue
+        task = TaskTable(**values)
+        tasks.append(task)
+        results.append({"index": index, "result": "created", "task": task})
+
+    with transaction.atomic():
+        TaskTable.objects.bulk_create(tasks, batch_size=500)
+        # bulk_create skips post_save: count the new tasks here
+        record_task_changes([(None, counter_state(task)) for task in tasks])
+    for result in results:
+        if "task" in result:
+            result["task_id"] = result.pop("task").task_id
+    return JsonResponse({"created": len(tasks), "results": results}, status=200)
+
+@csrf_exempt
+@require_http_methods(["PATCH"])
+def bulk_update_tasks(request):
+    """{"tasks": [{"task_id", ...fields to change}, ...]} -> one result per item.
+
+    Tasks are loaded in one query and the valid changes written with one bulk_update.
+    """
+    items, error = task_items(request)
+    if error:
+        return error
+
+    def task_id_of(item):
+        task_id = item.get("task_id") if isinstance(item, dict) else None
+        return task_id if isinstance(task_id, int) and not isinstance(task_id, bool) else None
+
+    ids = [task_id_of(item) for item in items if task_id_of(item) is not None]
+    users = referenced_users(items)
+    results, changed, fields = [], {}, set()
+    with transaction.atomic():
+        tasks = TaskTable.objects.select_for_update().in_bulk(ids)
+        counted = {task_id: counter_state(task) for task_id, task in tasks.items()}  # as locked
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results.append({"index": index, "result": "error", "errors": {"task": "Must be an object."}})
+                continue
+            if task_id_of(item) is None:
+                results.append({"index": index, "result": "error",
+                                "errors": {"task_id": "task_id must be an integer."}})
+                continue
+            task = tasks.get(task_id_of(item))
+            if task is None:
+                results.append({"index": index, "result": "not_found", "task_id": item["task_id"]})
+                continue
+            values, errors = clean_task_fields(item, users)
+            if errors:
+                results.append({"index": index, "task_id": task.task_id, "result": "error", "errors": errors})
+                continue
+            for attname, value in values.items():
+                setattr(task, attname, value)
+            fields.update(values)
+            changed[task.task_id] = task
+            results.append({"index": index, "task_id": task.task_id, "result": "updated"})
+
+        if changed:
+            now = timezone.now()
+            for task in changed.values():
+                task.updated_at = now  # bulk_update does not apply auto_now
+            TaskTable.objects.bulk_update(
+                list(changed.values()),
+                [name[:-3] if name.endswith("_id") else name for name in fields] + ["updated_at"],
+                batch_size=500,
+            )
+            record_task_changes([(counted[task.task_id], counter_state(task)) for task in changed.values()])
+    return JsonResponse({"updated": len(changed), "results": results}, status=200)
+
+# ----------------------------
+# Task status counters
+# ----------------------------
+from .task_counters import task_summary as task_status_counts
+
+@require_GET
+def task_summary(request):
+    """Task counts per status for ?email= and/or ?department=, read from TaskStatusCount."""
+    email = request.GET.get("email")
+    department = request.GET.get("department")
+    if not email and not department:
+        return JsonResponse({"error": "email or department is required."}, status=400)
+
+    data = {}
+    for scope, key in [("user", email), ("department", department)]:
+        if key:
+            counts = task_status_counts(scope, key)
+            data[scope] = {"key": key, "counts": counts, "total": sum(counts.values())}
+    return JsonResponse(data, status=200)
+
+# ----------------------------
+# Task alerts
+# ----------------------------
+from .models import TaskAlert
+from .task_alerts import sweep_task_alerts
+
+def task_alert_row(alert):
+    return {
+        "id": alert.id,
+        "task_id": alert.task_id,
+        "title": alert.task.title,
+        "status": alert.task.status,
+        "email": alert.email_id,
+        "kind": alert.kind,
+        "due_date": str(alert.due_date),
+        "created_at": str(alert.created_at),
+    }
+
+@require_GET
+def task_alerts(request):
+    """Stored overdue / due-soon alerts, soonest due first (?email=&kind=&cursor=&limit=)"""
+    return paginated_list(
+        request, TaskAlert.objects.all(), "alerts", task_alert_row,
+        filters={"email": "email", "kind": "kind"},
+        select_related=("task",),
+        columns={"title": ["task__title"], "status": ["task__status"]},
+    )
+
+@csrf_exempt
+@require_POST
+def sweep_task_alerts_view(request):
+    """Run the alert sweep now ({"days"?}); normally done by `manage.py sweep_task_alerts`."""
+    try:
+        data = json.loads(request.body or "{}")
+        days = int(data["days"]) if data.get("days") is not None else None
+    except (json.JSONDecodeError, TypeError, ValueError):
+        return JsonResponse({"error": "days must be an integer."}, status=400)
+    result = sweep_task_alerts(days=days)
+    print(f"[sweep_task_alerts] {result}")
+    return JsonResponse(result, status=200)
+
+# ----------------------------
+# Report search
+# ----------------------------
+from .listing import page_size
+from .report_search import search_reports as run_report_search
+
+@require_GET
+def search_reports(request):
+    """Full-text search over report title/description/content, best match first.
+
+    ?q= (required) &email=&date_from=&date_to=&offset=&limit=
+    """
+    text = request.GET.get("q", "").strip()
+    if not text:
+        return JsonResponse({"error": "q is required."}, status=400)
+    try:
+        date_from = parse_date(request.GET.get("date_from", ""))
+        date_to = parse_date(request.GET.get("date_to", ""))
+        offset = max(0, int(request.GET.get("offset", 0)))
+    except ValueError:
+        return JsonResponse({"error": "Invalid date or offset."}, status=400)
+
+    limit = page_size(request)
+    reports = run_report_search(
+        text, email=request.GET.get("email"), date_from=date_from, date_to=date_to,
+        offset=offset, limit=limit + 1,
+    )
+    return JsonResponse({
+        "reports": [
+            {**report_row(report), "rank": report.rank}
+            for report in reports[:limit]
+        ],
+        "next_offset": offset + limit if len(reports) > limit else None,
+    }, status=200)
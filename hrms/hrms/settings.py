@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -214,4 +215,93 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 DEBUG = True
 
 # SUPABASE_URL = os.getenv('SUPABASE_URL')
-# SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_SERVICE_KEY')
\ No newline at end of file
+# SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_SERVICE_KEY')
+# Face recognition: known faces are encoded once and cached as a float32 matrix
+KNOWN_FACES_DIR = os.path.join(BASE_DIR, "images")
+FACE_CACHE_PATH = os.getenv("FACE_CACHE_PATH", os.path.join(BASE_DIR, "face_cache.npy"))
+FACE_MATCH_TOLERANCE = float(os.getenv("FACE_MATCH_TOLERANCE", "0.6"))
+
+# Check-ins after this time (HH:MM, local wall clock) count as late arrivals
+ATTENDANCE_SHIFT_START = os.getenv("ATTENDANCE_SHIFT_START", "09:30")
+
+# list_* endpoints: default and maximum rows per page (cursor pagination)
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "100"))
+LIST_MAX_PAGE_SIZE = int(os.getenv("LIST_MAX_PAGE_SIZE", "1000"))
+
+# Face recognition process pool: frames beyond FACE_QUEUE_SIZE in flight wait up to
+# FACE_QUEUE_TIMEOUT seconds for a slot, then get a 503 with Retry-After.
+# The slots are lock files in FACE_SLOT_DIR shared by every gunicorn worker on the
+# host. The pool itself is per web worker (each loads the matrix), so the host runs
+# (gunicorn workers x FACE_POOL_WORKERS) recognition processes: keep one of them small.
+FACE_POOL_WORKERS = int(os.getenv("FACE_POOL_WORKERS", "2"))
+FACE_QUEUE_SIZE = int(os.getenv("FACE_QUEUE_SIZE", "8"))
+FACE_SLOT_DIR = os.getenv("FACE_SLOT_DIR", os.path.join(tempfile.gettempdir(), "hrms-face-slots"))
+FACE_QUEUE_TIMEOUT = float(os.getenv("FACE_QUEUE_TIMEOUT", "0.5"))
+FACE_RESULT_TIMEOUT = float(os.getenv("FACE_RESULT_TIMEOUT", "10"))
+FACE_RETRY_AFTER = int(os.getenv("FACE_RETRY_AFTER", "2"))
+FACE_MAX_FRAMES = int(os.getenv("FACE_MAX_FRAMES", "10"))
+
+# Holds the cache version counters (accounts/caching.py), so every process serving the
+# API must share it. The FileBasedCache default is shared by the gunicorn workers of one
+# host only, and its incr is not atomic; for several hosts (or heavy write load) set
+# DJANGO_CACHE_BACKEND to django.core.cache.backends.redis.RedisCache or a Memcached
+# backend and point DJANGO_CACHE_LOCATION at the shared server.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', os.path.join(BASE_DIR, '.django_cache')),
+    }
+}
+
+# Rows fetched per database round trip by the streaming export endpoints
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
+# Longest date range the team availability calendar will expand
+CALENDAR_MAX_DAYS = int(os.getenv("CALENDAR_MAX_DAYS", "366"))
+
+# Tasks due within this many days get a "due_soon" alert from sweep_task_alerts
+TASK_DUE_SOON_DAYS = int(os.getenv("TASK_DUE_SOON_DAYS", "3"))
+
+# Most items accepted by one bulk_create_tasks / bulk_update_tasks request
+TASK_BULK_LIMIT = int(os.getenv("TASK_BULK_LIMIT", "500"))
+
+# Leave days credited per month by `manage.py post_leave_accruals`; only these
+# leave types are balance-checked in apply_leave
+LEAVE_ACCRUAL_PER_MONTH = {
+    "Casual": "1.0",
+    "Sick": "1.0",
+    "Earned": "1.25",
+}
+
+# Payslip PDFs (accounts/payslips.py): rendered by a process pool into PAYSLIP_DIR,
+# one file per payroll id + row fingerprint
+PAYSLIP_DIR = os.getenv("PAYSLIP_DIR", os.path.join(BASE_DIR, "payslips"))
+PAYSLIP_WORKERS = int(os.getenv("PAYSLIP_WORKERS", "2"))
+PAYSLIP_RETRY_AFTER = int(os.getenv("PAYSLIP_RETRY_AFTER", "2"))
+# Seconds after which a render claimed by another (possibly dead) process is taken over
+PAYSLIP_RENDER_TIMEOUT = int(os.getenv("PAYSLIP_RENDER_TIMEOUT", "120"))
+
+# Server-side payroll components (accounts/payroll_rules.py). Rates are fractions
+# of the monthly basic salary; tax slabs are [annual income lower bound, marginal
+# rate]. Off by default so existing clients can keep sending allowances/deductions/tax;
+# with PAYROLL_RULES_ENABLED=1 the server computes them and rejects client values.
+DEFAULT_PAYROLL_RULES = {
+    "allowances": {
+        "HRA": "0.40",
+        "Conveyance": {"flat": "1600"},
+    },
+    "deductions": {
+        "Provident Fund": {"rate": "0.12", "cap": "1800"},
+        "Professional Tax": {"flat": "200"},
+    },
+    "standard_deduction": "50000",
+    "tax_slabs": [
+        ["0", "0"],
+        ["300000", "0.05"],
+        ["700000", "0.10"],
+        ["1000000", "0.15"],
+        ["1200000", "0.20"],
+        ["1500000", "0.30"],
+    ],
+}
+PAYROLL_RULES = DEFAULT_PAYROLL_RULES if os.getenv("PAYROLL_RULES_ENABLED", "0") == "1" else None